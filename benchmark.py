@@ -0,0 +1,624 @@
+# Course: CS261 - Data Structures
+# Student Name: Nick Askam
+# Assignment: 6
+# Description: Benchmark harness for the graph classes. Generates seeded random, power-law, grid and DAG graphs,
+#               times the main operations, records peak memory and checks every answer against a reference
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from collections import deque
+from heapq import heappop, heappush
+
+import d_graph
+from d_graph import CompactDirectedGraph, DirectedGraph, NumpyDirectedGraph, SparseDirectedGraph
+from ud_graph import CompactUndirectedGraph, InternedUndirectedGraph, UndirectedGraph
+
+# graph classes that get benchmarked, dense matrices are skipped above --dense-limit vertices
+DIRECTED_CLASSES = [DirectedGraph, SparseDirectedGraph, CompactDirectedGraph]
+UNDIRECTED_CLASSES = [UndirectedGraph, InternedUndirectedGraph, CompactUndirectedGraph]
+DENSE_CLASSES = [DirectedGraph, NumpyDirectedGraph, CompactDirectedGraph]
+
+# numpy is optional
+if d_graph.np is not None:
+    DIRECTED_CLASSES.append(NumpyDirectedGraph)
+
+GRAPH_KINDS = ['random', 'power_law', 'grid', 'dag']
+
+
+# ------------------------------------------------------------------ #
+# graph generators, all return (vertex count, [(u, v, weight)]) with integer vertices
+
+def random_edges(n: int, rng, avg_degree: int = 4) -> (int, []):
+    """
+    Uniform random edges, about avg_degree per vertex
+    """
+    edges = []
+    for _ in range(n * avg_degree):
+        u, v = rng.randrange(n), rng.randrange(n)
+        if u != v:
+            edges.append((u, v, rng.randint(1, 100)))
+    return n, edges
+
+
+def power_law_edges(n: int, rng, m: int = 3) -> (int, []):
+    """
+    Preferential attachment (Barabasi-Albert), each new vertex links to m existing ones
+    Edge directions are picked at random so the directed version has cycles
+    """
+    edges = []
+    endpoints = list(range(min(m, n)))
+    for u in range(min(m, n), n):
+        picked = set()
+        while len(picked) < m:
+            picked.add(rng.choice(endpoints))
+        for v in picked:
+            if rng.random() < 0.5:
+                edges.append((u, v, rng.randint(1, 100)))
+            else:
+                edges.append((v, u, rng.randint(1, 100)))
+            endpoints.append(v)
+            endpoints.append(u)
+    return n, edges
+
+
+def grid_edges(n: int, rng) -> (int, []):
+    """
+    Square grid with about n vertices, edges point right and down
+    """
+    side = max(1, int(n ** 0.5))
+    edges = []
+    for row in range(side):
+        for col in range(side):
+            v = row * side + col
+            if col + 1 < side:
+                edges.append((v, v + 1, rng.randint(1, 100)))
+            if row + 1 < side:
+                edges.append((v, v + side, rng.randint(1, 100)))
+    return side * side, edges
+
+
+def dag_edges(n: int, rng, avg_degree: int = 4) -> (int, []):
+    """
+    Random edges that always go from a lower to a higher vertex id
+    """
+    edges = []
+    for _ in range(n * avg_degree):
+        u, v = rng.randrange(n), rng.randrange(n)
+        if u != v:
+            u, v = min(u, v), max(u, v)
+            edges.append((u, v, rng.randint(1, 100)))
+    return n, edges
+
+
+GENERATORS = {
+    'random': random_edges,
+    'power_law': power_law_edges,
+    'grid': grid_edges,
+    'dag': dag_edges,
+}
+
+
+def vertex_name(v: int) -> str:
+    """
+    String name used for vertex v in undirected graphs
+    """
+    return f'v{v}'
+
+
+# ------------------------------------------------------------------ #
+# reference implementations, deliberately simple so they are easy to trust
+
+def reference_directed(n: int, edges: []) -> {}:
+    """
+    Return {u: {v: weight}} with the graph rules applied (no loops, last weight wins)
+    """
+    adjacency = {v: {} for v in range(n)}
+    for u, v, weight in edges:
+        if u != v:
+            adjacency[u][v] = weight
+    return adjacency
+
+
+def reference_undirected(edges: []) -> {}:
+    """
+    Return {u: set of neighbours} for string vertex pairs
+    """
+    adjacency = {}
+    for u, v in edges:
+        if u != v:
+            adjacency.setdefault(u, set()).add(v)
+            adjacency.setdefault(v, set()).add(u)
+    return adjacency
+
+
+def reference_dfs(adjacency: {}, start, end=None) -> []:
+    """
+    DFS visiting neighbours in ascending order
+    """
+    if start not in adjacency:
+        return []
+    order, seen, stack = [], set(), [start]
+    while stack:
+        v = stack.pop()
+        if v in seen:
+            continue
+        seen.add(v)
+        order.append(v)
+        if v == end:
+            break
+        stack.extend(sorted(adjacency[v], reverse=True))
+    return order
+
+
+def reference_bfs(adjacency: {}, start, end=None) -> []:
+    """
+    BFS visiting neighbours in ascending order
+    """
+    if start not in adjacency:
+        return []
+    order, seen, queue = [start], {start}, deque([start])
+    while queue and start != end:
+        v = queue.popleft()
+        for w in sorted(adjacency[v]):
+            if w not in seen:
+                seen.add(w)
+                order.append(w)
+                queue.append(w)
+            if w == end:
+                return order
+    return order
+
+
+def reference_dijkstra(adjacency: {}, src: int) -> []:
+    """
+    Textbook heap Dijkstra over {u: {v: weight}}
+    """
+    distance = {src: 0}
+    done = set()
+    heap = [(0, src)]
+    while heap:
+        d, v = heappop(heap)
+        if v in done:
+            continue
+        done.add(v)
+        for w, weight in adjacency[v].items():
+            if w not in distance or d + weight < distance[w]:
+                distance[w] = d + weight
+                heappush(heap, (d + weight, w))
+    return [distance.get(v, float('inf')) for v in range(len(adjacency))]
+
+
+def reference_directed_cycle(adjacency: {}) -> bool:
+    """
+    A directed graph is acyclic exactly when Kahn's algorithm removes every vertex
+    """
+    in_degree = {v: 0 for v in adjacency}
+    for v in adjacency:
+        for w in adjacency[v]:
+            in_degree[w] += 1
+    ready = [v for v in adjacency if in_degree[v] == 0]
+    removed = 0
+    while ready:
+        v = ready.pop()
+        removed += 1
+        for w in adjacency[v]:
+            in_degree[w] -= 1
+            if in_degree[w] == 0:
+                ready.append(w)
+    return removed != len(adjacency)
+
+
+def reference_scc_count(adjacency: {}) -> int:
+    """
+    Count strongly connected components with Kosaraju: finish order on the graph, then sweep the reverse graph
+    """
+    finished = []
+    seen = set()
+    for start in adjacency:
+        if start in seen:
+            continue
+        seen.add(start)
+        stack = [(start, iter(adjacency[start]))]
+        while stack:
+            v, neighbours = stack[-1]
+            for w in neighbours:
+                if w not in seen:
+                    seen.add(w)
+                    stack.append((w, iter(adjacency[w])))
+                    break
+            else:
+                stack.pop()
+                finished.append(v)
+
+    reverse = {v: [] for v in adjacency}
+    for v in adjacency:
+        for w in adjacency[v]:
+            reverse[w].append(v)
+
+    seen = set()
+    count = 0
+    for start in reversed(finished):
+        if start in seen:
+            continue
+        count += 1
+        seen.add(start)
+        stack = [start]
+        while stack:
+            for w in reverse[stack.pop()]:
+                if w not in seen:
+                    seen.add(w)
+                    stack.append(w)
+    return count
+
+
+def reference_components(adjacency: {}) -> int:
+    """
+    Count components by labelling with BFS
+    """
+    seen = set()
+    count = 0
+    for start in adjacency:
+        if start in seen:
+            continue
+        count += 1
+        seen.add(start)
+        queue = deque([start])
+        while queue:
+            for w in adjacency[queue.popleft()]:
+                if w not in seen:
+                    seen.add(w)
+                    queue.append(w)
+    return count
+
+
+def reference_undirected_cycle(adjacency: {}) -> bool:
+    """
+    A forest has exactly V - C edges, anything more closes a cycle
+    """
+    edge_count = sum(len(neighbours) for neighbours in adjacency.values()) // 2
+    return edge_count > len(adjacency) - reference_components(adjacency)
+
+
+def reference_valid_path(adjacency: {}, path: []) -> bool:
+    """
+    Every vertex must exist and every consecutive pair must be an edge
+    """
+    if not path:
+        return True
+    if any(v not in adjacency for v in path):
+        return False
+    return all(b in adjacency[a] for a, b in zip(path, path[1:]))
+
+
+def reference_remove_vertex(adjacency: {}, v: int) -> None:
+    """
+    Delete v and its edges, then give the last vertex the id v like DirectedGraph.remove_vertex()
+    """
+    last = len(adjacency) - 1
+    del adjacency[v]
+    for row in adjacency.values():
+        row.pop(v, None)
+    if v != last:
+        adjacency[v] = adjacency.pop(last)
+        for row in adjacency.values():
+            if last in row:
+                row[v] = row.pop(last)
+
+
+# ------------------------------------------------------------------ #
+# measurement
+
+class Recorder:
+    """
+    Collects one result row per timed operation
+    """
+
+    def __init__(self, measure_memory: bool):
+        """
+        Start with no results
+        """
+        self.measure_memory = measure_memory
+        self.results = []
+        self.mismatches = 0
+
+    def run(self, info: {}, op: str, func, check=None):
+        """
+        Time func(), optionally record its peak memory, then validate the answer with check(answer)
+        """
+        if self.measure_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        answer = func()
+        seconds = time.perf_counter() - start
+        peak = None
+        if self.measure_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        valid = None if check is None else bool(check(answer))
+        if valid is False:
+            self.mismatches += 1
+
+        row = dict(info, op=op, seconds=seconds, peak_bytes=peak, valid=valid)
+        self.results.append(row)
+        print('{graph:<24} {kind:<10} {n:>8} {op:<32} {seconds:>10.4f}s {status}'.format(
+            status={None: '', True: 'ok', False: 'MISMATCH'}[valid], **row))
+        return answer
+
+    def measure(self, info: {}, op: str, value) -> None:
+        """
+        Record a value that is not a timing, such as a memory estimate
+        """
+        row = dict(info, op=op, value=value)
+        self.results.append(row)
+        print('{graph:<24} {kind:<10} {n:>8} {op:<32} {value:>11}'.format(**row))
+
+
+def walk(adjacency: {}, start, length: int, rng) -> []:
+    """
+    Random walk along existing edges, used to make paths that should be valid
+    """
+    path = [start]
+    while len(path) < length and adjacency[path[-1]]:
+        path.append(rng.choice(sorted(adjacency[path[-1]])))
+    return path
+
+
+def bench_directed(recorder: Recorder, cls, kind: str, n: int, edges: [], args, rng) -> None:
+    """
+    Benchmark one directed graph class on one generated graph
+    """
+    reference = reference_directed(n, edges)
+    info = {'graph': cls.__name__, 'kind': kind, 'n': n, 'edges': len(edges)}
+    starts = [rng.randrange(n) for _ in range(args.queries)]
+
+    g = recorder.run(info, 'construct', lambda: _build_directed(cls, n, edges))
+    recorder.measure(info, 'memory_usage bytes', g.memory_usage())
+    expected_edges = {(u, v, w) for u in reference for v, w in reference[u].items()}
+    recorder.run(info, 'from_edges', lambda: cls.from_edges(edges),
+                 lambda answer: set(answer.get_edges()) == expected_edges)
+    recorder.run(info, 'get_edges', g.get_edges, lambda answer: set(answer) == expected_edges)
+
+    for v in starts:
+        recorder.run(info, 'dfs', lambda: g.dfs(v), lambda answer: answer == reference_dfs(reference, v))
+        recorder.run(info, 'bfs', lambda: g.bfs(v), lambda answer: answer == reference_bfs(reference, v))
+        recorder.run(info, 'dijkstra', lambda: g.dijkstra(v),
+                     lambda answer: answer == reference_dijkstra(reference, v))
+
+    # the same queries again with the cache on and already warm
+    g.cache_queries()
+    for v in starts:
+        g.dijkstra(v)
+    recorder.run(info, f'dijkstra cached x{len(starts)}', lambda: [g.dijkstra(v) for v in starts],
+                 lambda answer: answer == [reference_dijkstra(reference, v) for v in starts])
+    g.cache_queries(False)
+
+    # point to point queries, every method has to find the reference distance
+    pairs = [(rng.randrange(n), rng.randrange(n)) for _ in range(args.queries)]
+    methods = {'dijkstra': None, 'bidirectional': None}
+    if kind == 'grid':
+        methods['astar'] = _grid_heuristic(n)
+    for method, heuristic in methods.items():
+        expected = [reference_dijkstra(reference, src)[dst] for src, dst in pairs]
+        recorder.run(info, f'shortest_path {method} x{len(pairs)}',
+                     lambda: [g.shortest_path(src, dst, method, heuristic)[0] for src, dst in pairs],
+                     lambda answer: answer == expected)
+
+    recorder.run(info, 'has_cycle', g.has_cycle, lambda answer: answer == reference_directed_cycle(reference))
+
+    def labels_match(labels):
+        # right number of components and every edge goes forwards in label order
+        return (len(set(labels)) == reference_scc_count(reference)
+                and all(labels[u] <= labels[v] for u in reference for v in reference[u]))
+
+    recorder.run(info, 'strongly_connected_components', g.strongly_connected_components, labels_match)
+
+    # answered from the reverse index, which bidirectional shortest_path() already built
+    expected_predecessors = [sorted(u for u in reference if v in reference[u]) for v in starts]
+    recorder.run(info, f'predecessors x{len(starts)}', lambda: [g.predecessors(v) for v in starts],
+                 lambda answer: answer == expected_predecessors)
+
+    paths = _sample_paths(reference, list(range(n)), args, rng)
+    expected_paths = [reference_valid_path(reference, p) for p in paths]
+    recorder.run(info, f'is_valid_path x{len(paths)}', lambda: [g.is_valid_path(p) for p in paths],
+                 lambda answer: answer == expected_paths)
+    recorder.run(info, f'validate_paths x{len(paths)}', lambda: g.validate_paths(paths)[0],
+                 lambda answer: answer == expected_paths)
+
+    # mutations run last since they change the graph
+    changes = [(rng.randrange(n), rng.randrange(n), rng.randint(1, 100)) for _ in range(args.mutations)]
+    changes = [(u, v, w) for u, v, w in changes if u != v]
+
+    def add_edges():
+        for u, v, w in changes:
+            g.add_edge(u, v, w)
+            reference[u][v] = w
+
+    def remove_edges():
+        for u, v, _ in changes:
+            g.remove_edge(u, v)
+            reference[u].pop(v, None)
+
+    def edges_match(_):
+        return set(g.get_edges()) == {(u, v, w) for u in reference for v, w in reference[u].items()}
+
+    # the last vertex takes over the id of each removed one
+    doomed = [rng.randrange(n - i) for i in range(min(args.mutations, n - 1))]
+
+    def remove_vertices():
+        for v in doomed:
+            g.remove_vertex(v)
+
+    def vertices_removed(answer):
+        # the reference catches up after the timing, its renumbering is O(V) per vertex
+        for v in doomed:
+            reference_remove_vertex(reference, v)
+        return edges_match(answer)
+
+    recorder.run(info, f'add_edge x{len(changes)}', add_edges, edges_match)
+    recorder.run(info, f'remove_edge x{len(changes)}', remove_edges, edges_match)
+    recorder.run(info, f'remove_vertex x{len(doomed)}', remove_vertices, vertices_removed)
+
+
+def bench_undirected(recorder: Recorder, cls, kind: str, n: int, edges: [], args, rng) -> None:
+    """
+    Benchmark one undirected graph class on one generated graph
+    """
+    pairs = [(vertex_name(u), vertex_name(v)) for u, v, _ in edges]
+    reference = reference_undirected(pairs)
+    info = {'graph': cls.__name__, 'kind': kind, 'n': n, 'edges': len(pairs)}
+    names = sorted(reference)
+    starts = [rng.choice(names) for _ in range(args.queries)] if names else []
+
+    g = recorder.run(info, 'construct', lambda: cls(pairs))
+    recorder.measure(info, 'memory_usage bytes', g.memory_usage())
+    expected_edges = {frozenset((u, v)) for u in reference for v in reference[u]}
+    recorder.run(info, 'from_edges', lambda: cls.from_edges(pairs),
+                 lambda answer: {frozenset(e) for e in answer.get_edges()} == expected_edges)
+    recorder.run(info, 'get_edges', g.get_edges,
+                 lambda answer: len(answer) == len(expected_edges) and set(map(frozenset, answer)) == expected_edges)
+
+    for v in starts:
+        recorder.run(info, 'dfs', lambda: g.dfs(v), lambda answer: answer == reference_dfs(reference, v))
+        recorder.run(info, 'bfs', lambda: g.bfs(v), lambda answer: answer == reference_bfs(reference, v))
+
+    # the same queries again with the cache on and already warm
+    g.cache_queries()
+    for v in starts:
+        g.bfs(v)
+    recorder.run(info, f'bfs cached x{len(starts)}', lambda: [g.bfs(v) for v in starts],
+                 lambda answer: answer == [reference_bfs(reference, v) for v in starts])
+    g.cache_queries(False)
+
+    recorder.run(info, 'count_connected_components', g.count_connected_components,
+                 lambda answer: answer == reference_components(reference))
+    recorder.run(info, 'has_cycle', g.has_cycle, lambda answer: answer == reference_undirected_cycle(reference))
+
+    paths = _sample_paths(reference, names, args, rng)
+    expected_paths = [reference_valid_path(reference, p) for p in paths]
+    recorder.run(info, f'is_valid_path x{len(paths)}', lambda: [g.is_valid_path(p) for p in paths],
+                 lambda answer: answer == expected_paths)
+    recorder.run(info, f'validate_paths x{len(paths)}', lambda: g.validate_paths(paths)[0],
+                 lambda answer: answer == expected_paths)
+
+    # mutations run last since they change the graph
+    changes = [(vertex_name(rng.randrange(n)), vertex_name(rng.randrange(n))) for _ in range(args.mutations)]
+    changes = [(u, v) for u, v in changes if u != v]
+    doomed = sorted({rng.choice(names) for _ in range(args.mutations)}) if names else []
+
+    def add_edges():
+        for u, v in changes:
+            g.add_edge(u, v)
+            reference.setdefault(u, set()).add(v)
+            reference.setdefault(v, set()).add(u)
+
+    def remove_edges():
+        for u, v in changes:
+            g.remove_edge(u, v)
+            reference[u].discard(v)
+            reference[v].discard(u)
+
+    def remove_vertices():
+        for v in doomed:
+            g.remove_vertex(v)
+            for w in reference.pop(v, ()):
+                reference[w].discard(v)
+
+    def edges_match(_):
+        return {frozenset(e) for e in g.get_edges()} == {frozenset((u, v)) for u in reference for v in reference[u]}
+
+    recorder.run(info, f'add_edge x{len(changes)}', add_edges, edges_match)
+    recorder.run(info, f'remove_edge x{len(changes)}', remove_edges, edges_match)
+    recorder.run(info, f'remove_vertex x{len(doomed)}', remove_vertices, edges_match)
+
+
+def _build_directed(cls, n: int, edges: []):
+    """
+    Build a directed graph with exactly n vertices, even if the last ones have no edges
+    """
+    g = cls(edges)
+    while g.v_count < n:
+        g.add_vertex()
+    return g
+
+
+def _grid_heuristic(n: int):
+    """
+    Manhattan distance on the grid, every edge weighs at least 1 so it never overestimates
+    """
+    side = max(1, int(n ** 0.5))
+
+    def heuristic(v: int, dst: int) -> int:
+        return abs(v // side - dst // side) + abs(v % side - dst % side)
+
+    return heuristic
+
+
+def _sample_paths(reference: {}, vertices: [], args, rng) -> []:
+    """
+    Half the paths follow real edges, the other half are random vertex sequences
+    """
+    paths = []
+    if not vertices:
+        return paths
+    for index in range(args.paths):
+        if index % 2 == 0:
+            paths.append(walk(reference, rng.choice(vertices), args.path_length, rng))
+        else:
+            paths.append([rng.choice(vertices) for _ in range(args.path_length)])
+    return paths
+
+
+def main(argv=None) -> int:
+    """
+    Run the benchmark, print a table and optionally write the results as JSON
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the graph classes on generated graphs')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000],
+                        help='vertex counts to generate (default: 1000 10000)')
+    parser.add_argument('--kinds', nargs='+', choices=GRAPH_KINDS, default=GRAPH_KINDS)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--queries', type=int, default=3, help='start vertices for dfs / bfs / dijkstra')
+    parser.add_argument('--paths', type=int, default=1000, help='paths given to is_valid_path')
+    parser.add_argument('--path-length', type=int, default=8)
+    parser.add_argument('--mutations', type=int, default=1000, help='edges added, removed and vertices removed')
+    parser.add_argument('--dense-limit', type=int, default=5000,
+                        help='largest vertex count for adjacency matrix classes')
+    parser.add_argument('--memory', action='store_true', help='record peak memory with tracemalloc (slower)')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    recorder = Recorder(args.memory)
+    for n in args.sizes:
+        for kind in args.kinds:
+            # every class sees the same graph for a given seed, kind and size
+            n_vertices, edges = GENERATORS[kind](n, random.Random(f'{args.seed}-{kind}-{n}'))
+            for cls in DIRECTED_CLASSES:
+                if cls in DENSE_CLASSES and n_vertices > args.dense_limit:
+                    continue
+                bench_directed(recorder, cls, kind, n_vertices, edges, args, random.Random(args.seed))
+            for cls in UNDIRECTED_CLASSES:
+                bench_undirected(recorder, cls, kind, n_vertices, edges, args, random.Random(args.seed))
+
+    if args.output:
+        with open(args.output, 'w') as out:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'seed': args.seed,
+                'results': recorder.results,
+            }, out, indent=2)
+
+    if recorder.mismatches:
+        print(f'{recorder.mismatches} results did not match the reference', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,7 +3,25 @@
 # Assignment: 6
 # Description: Directed Graph that has implementation to add, get the edges, find if it has a cycle, dfs, bfs, etc
 
-class DirectedGraph:
+import operator
+from array import array
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from heapq import heappop, heappush
+from multiprocessing import shared_memory
+
+import graph_async
+import graph_io
+from graph_common import GraphCommon
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed by NumpyDirectedGraph
+    np = None
+
+
+class DirectedGraph(GraphCommon):
     """
     Class to implement directed weighted graph
     - duplicate edges not allowed
@@ -12,6 +30,23 @@ class DirectedGraph:
     - vertex names are integers
     """
 
+    # incremental topological order, only kept while track_acyclicity() is on
+    _topo = None
+    # reverse index {source: weight} of the edges entering each vertex,
+    # built on first use and then kept up to date by add_edge() / remove_edge()
+    _reverse = None
+    # what cache_queries() remembers
+    _cached_queries = ('dfs', 'bfs', 'dijkstra', 'shortest_path', 'has_cycle', 'topological_sort',
+                       'strongly_connected_components')
+    # what instrument() wraps
+    _instrumented = {'dfs': 'op', 'bfs': 'op', 'dijkstra': 'op', 'shortest_path': 'op', 'has_cycle': 'op',
+                     'topological_sort': 'op', 'strongly_connected_components': 'op',
+                     'add_vertex': 'op', 'add_edge': 'op', 'remove_edge': 'op', 'remove_vertex': 'op',
+                     '_out_edges': 'expand', '_in_edges': 'expand', '_heap_push': 'push', '_heap_pop': 'pop'}
+    # the searches reach the heap through these so instrument() can count pushes and pops
+    _heap_push = staticmethod(heappush)
+    _heap_pop = staticmethod(heappop)
+
     def __init__(self, start_edges=None):
         """
         Store graph info as adjacency matrix
@@ -61,6 +96,7 @@ class DirectedGraph:
             self.adj_matrix[v].append(0)
             v -= 1
         self.v_count += 1
+        self._vertex_added()
         return self.v_count
 
     def add_edge(self, src: int, dst: int, weight=1) -> None:
@@ -68,8 +104,9 @@ class DirectedGraph:
         Add an edge to the graph
         """
         # add in the source and destination to the weight
-        if self.v_count > src != dst < self.v_count:
+        if 0 <= src < self.v_count and 0 <= dst < self.v_count and src != dst:
             self.adj_matrix[src][dst] = weight
+            self._edge_changed(src, dst, weight)
 
     def remove_edge(self, src: int, dst: int) -> None:
         """
@@ -77,206 +114,1591 @@ class DirectedGraph:
         """
         if self.v_count > src >= 0 and self.v_count > dst >= 0 and self.adj_matrix[src][dst] != 0:
             self.adj_matrix[src][dst] = 0
+            self._edge_changed(src, dst, 0)
+
+    def _vertex_added(self) -> None:
+        """
+        Keep the optional indexes in step with a new vertex
+        """
+        self._version += 1
+        if self._reverse is not None:
+            self._reverse.append({})
+        if self._topo is not None:
+            self._topo.vertex_added()
+
+    def _edge_changed(self, src: int, dst: int, weight) -> None:
+        """
+        Keep the optional indexes in step with an edge change, a weight of 0 means removed
+        """
+        self._version += 1
+        if self._reverse is not None:
+            if weight != 0:
+                self._reverse[dst][src] = weight
+            else:
+                self._reverse[dst].pop(src, None)
+        if self._topo is not None:
+            if weight != 0:
+                self._topo.edge_added(src, dst)
+            else:
+                self._topo.edge_removed(src, dst)
+
+    def remove_vertex(self, v: int) -> None:
+        """
+        Remove vertex v and every edge going in or out of it
+        Vertex ids have to stay 0 .. v_count - 1, so the last vertex takes over id v.
+        Only edges at v and at the last vertex are looked at, found through the forward
+        and reverse indexes (the matrix still drops one column from every row)
+        """
+        if not self._has_vertex(v):
+            return
+
+        for dst, _ in self._out_edges(v):
+            self.remove_edge(v, dst)
+        for src, _ in self._in_edges(v):
+            self.remove_edge(src, v)
+
+        last = self.v_count - 1
+        out_edges, in_edges = self._out_edges(last), self._in_edges(last)
+        self._move_last_vertex(v, out_edges, in_edges)
+        self._vertex_removed(v, last, out_edges)
+
+    def _move_last_vertex(self, v: int, out_edges: [], in_edges: []) -> None:
+        """
+        Give the edges of the last vertex to v (which has none left) and drop the last vertex
+        """
+        matrix = self.adj_matrix
+        last = self.v_count - 1
+        row = matrix.pop()
+        if v != last:
+            matrix[v] = row
+            for src, weight in in_edges:
+                matrix[src][v] = weight
+        for row in matrix:
+            row.pop()
+        self.v_count -= 1
+
+    def _vertex_removed(self, v: int, last: int, out_edges: []) -> None:
+        """
+        Keep the optional indexes in step after the last vertex was renumbered to v
+        """
+        self._version += 1
+        if self._reverse is not None:
+            moved = self._reverse.pop()
+            if v != last:
+                self._reverse[v] = moved
+                for dst, _ in out_edges:
+                    self._reverse[dst][v] = self._reverse[dst].pop(last)
+        if self._topo is not None:
+            self._topo.vertex_removed(v, last)
+
+    def copy(self) -> 'DirectedGraph':
+        """
+        Return an independent graph of the same class with the same vertices and edges
+        Indexes, caches and instrumentation are not carried over
+        """
+        graph = type(self)()
+        graph._load_csr(*self._csr_rows())
+        return graph
 
     def get_vertices(self) -> []:
         """
         Get the vertices on the graph
         """
-        vertices = []
-        index_value = 0
-        for _ in self.adj_matrix:
-            vertices.append(index_value)
-            index_value += 1
-        return vertices
+        return list(range(self.v_count))
 
     def get_edges(self) -> []:
         """
         Get the edges on the graph
         """
-        edges_in_graph = []
-        source_index = 0
+        return list(self.iter_edges())
 
-        # go through each list to find the values
-        for source in self.adj_matrix:
-            destination_index = 0
-            for destination in source:
-                if destination != 0:
-                    edges_in_graph.append((source_index, destination_index, destination))
-                destination_index += 1
-            source_index += 1
+    def iter_edges(self):
+        """
+        Yield each edge as (src, dst, weight), row by row
+        """
+        for source_index in range(self.v_count):
+            for destination_index, weight in self._out_edges(source_index):
+                yield source_index, destination_index, weight
 
-        return edges_in_graph
+    def _has_vertex(self, v) -> bool:
+        """
+        Return True if v names a vertex of the graph, any integer type (numpy ints too) is accepted
+        """
+        try:
+            return 0 <= operator.index(v) < self.v_count
+        except TypeError:
+            return False
 
-    def is_valid_path(self, path: []) -> bool:
+    def _out_edges(self, v: int) -> []:
         """
-        Find out if the path that is given is valid
+        Return (destination, weight) pairs leaving v in ascending destination order
         """
-        # if the path is empty
-        if not path:
-            return True
+        return [(dst, weight) for dst, weight in enumerate(self.adj_matrix[v]) if weight != 0]
 
-        path_length = path.__len__()
-        path_index = 0
+    def _edge_weight(self, src: int, dst: int) -> int:
+        """
+        Return the weight of the edge src -> dst, 0 if there is no edge
+        """
+        return self.adj_matrix[src][dst]
 
-        # if the path only has one element
-        if path_length == 1:
-            if path[0] in self.get_vertices():
-                return True
-            else:
-                return False
-
-        while path_index < path_length - 1:
-            # if the path is in the list
-            if path[path_index] in self.get_vertices():
-                # change the path index check
-                path_index_check = path_index + 1
-                # see if it equals 0
-                if self.adj_matrix[path[path_index]][path[path_index_check]] > 0:
-                    path_index += 1
-                else:
-                    return False
-            else:
-                return False
+    def _in_edges(self, v: int) -> []:
+        """
+        Return (source, weight) pairs entering v in ascending source order
+        """
+        return sorted(self._reverse_index()[v].items())
 
-        return True
+    def _reverse_index(self) -> []:
+        """
+        Return the reverse index, building it in O(V + E) the first time it is needed
+        """
+        if self._reverse is None:
+            reverse = [{} for _ in range(self.v_count)]
+            for src in range(self.v_count):
+                for dst, weight in self._out_edges(src):
+                    reverse[dst][src] = weight
+            self._reverse = reverse
+        return self._reverse
 
-    def dfs(self, v_start, v_end=None) -> []:
+    def in_degree(self, v: int) -> int:
         """
-        Return list of vertices visited during DFS search
-        Vertices are picked in alphabetical order
+        Return the number of edges entering v, 0 if v is not in the graph
         """
-        reachable_vertices = []
+        if not self._has_vertex(v):
+            return 0
+        return len(self._reverse_index()[v])
 
-        if v_start not in self.get_vertices():
-            return reachable_vertices
+    def predecessors(self, v: int) -> []:
+        """
+        Return the vertices with an edge into v in ascending order, O(in-degree) through the reverse index
+        """
+        if not self._has_vertex(v):
+            return []
+        return [src for src, _ in self._in_edges(v)]
 
-        stack = [v_start]
+    def is_valid_path(self, path: []) -> bool:
+        """
+        Find out if the path that is given is valid
+        """
+        return self._first_bad_vertex(path, self._edge_weight) == -1
 
-        # as long as the stack is not empty
-        while stack.__len__() > 0:
-            popped_vertex = stack.pop()
-            # if the popped vertex is not in the current reachable vertices
-            if popped_vertex not in reachable_vertices:
-                reachable_vertices.append(popped_vertex)
+    def validate_paths(self, paths) -> ([], []):
+        """
+        Check many paths at once, returns (valid, first_bad) lists lined up with paths
+        first_bad[i] is the index of the first vertex of paths[i] that is missing or has
+        no edge into it from the vertex before, -1 if the whole path is valid
+        """
+        has_edge = self._edge_lookup()
+        first_bad = [self._first_bad_vertex(path, has_edge) for path in paths]
+        return [bad == -1 for bad in first_bad], first_bad
 
-                if popped_vertex == v_end:
-                    return reachable_vertices
+    def _first_bad_vertex(self, path: [], has_edge) -> int:
+        """
+        Return the index of the first vertex where path breaks, -1 if it does not
+        """
+        for index, vertex in enumerate(path):
+            if not self._has_vertex(vertex):
+                return index
+            if index and not has_edge(path[index - 1], vertex):
+                return index
+        return -1
 
-                # set the index to start looking at the end of the list and then go backwards
-                vertex_index = len(self.get_vertices()) - 1
-                for _ in self.adj_matrix[popped_vertex]:
-                    # if the path length is not 0, add to the stack
-                    if self.adj_matrix[popped_vertex][vertex_index] != 0:
-                        stack.append(vertex_index)
-                    vertex_index -= 1
+    def _edge_lookup(self):
+        """
+        Return a function (src, dst) that is truthy if the edge exists, used for batches of lookups
+        """
+        return self._edge_weight
 
-        return reachable_vertices
+    def dfs(self, v_start, v_end=None) -> []:
+        """
+        Return list of vertices visited during DFS search
+        Vertices are picked in alphabetical order
+        """
+        stop_when = None if v_end is None else (lambda vertex: vertex == v_end)
+        return list(self.iter_dfs(v_start, stop_when=stop_when))
 
     def bfs(self, v_start, v_end=None) -> []:
         """
         Return list of vertices visited during BFS search
         Vertices are picked in alphabetical order
         """
-        reachable_vertices = []
+        stop_when = None if v_end is None else (lambda vertex: vertex == v_end)
+        return list(self.iter_bfs(v_start, stop_when=stop_when))
 
-        if v_start not in self.get_vertices():
-            return reachable_vertices
+    def iter_dfs(self, v_start, max_depth=None, stop_when=None, with_info=False, reverse=False):
+        """
+        Yield vertices in DFS order as they are visited, smallest neighbour first
+        - vertices at max_depth are yielded but not expanded
+        - the walk ends right after a vertex for which stop_when(vertex) is True
+        - with_info yields (vertex, depth, parent) with depth along the DFS tree
+        - reverse follows edges backwards, visiting everything that can reach v_start
+        """
+        if not self._has_vertex(v_start):
+            return
 
-        # set the stack constants
-        stack = [v_start]
-        reachable_vertices.append(v_start)
+        neighbours = self._in_edges if reverse else self._out_edges
+        visited = bytearray(self.v_count)
+        stack = [(v_start, 0, None)]
 
         # as long as the stack is not empty
-        while stack.__len__() > 0:
-            # pop the last element
-            popped_vertex = stack.pop()
-            # return if at the end of the stack
-            if popped_vertex == v_end:
-                return reachable_vertices
+        while stack:
+            vertex, depth, parent = stack.pop()
+            if visited[vertex]:
+                continue
+            visited[vertex] = 1
+            yield (vertex, depth, parent) if with_info else vertex
+
+            if stop_when is not None and stop_when(vertex):
+                return
+            if max_depth is not None and depth >= max_depth:
+                continue
 
-            vertex_index = 0
-            for _ in self.adj_matrix[popped_vertex]:
-                # do processing if the sibling is not in reachable vertices and the index is filled
-                if self.adj_matrix[popped_vertex][vertex_index] != 0 and vertex_index not in reachable_vertices:
-                    reachable_vertices.append(vertex_index)
-                    stack.insert(0, vertex_index)
+            # start looking at the end of the neighbours and then go backwards
+            for vertex_index, _ in reversed(neighbours(vertex)):
+                if not visited[vertex_index]:
+                    stack.append((vertex_index, depth + 1, vertex))
 
-                # return if at the end of the stack
-                if vertex_index == v_end:
-                    return reachable_vertices
+    def iter_bfs(self, v_start, max_depth=None, stop_when=None, with_info=False, reverse=False):
+        """
+        Yield vertices in BFS order as they are discovered, smallest neighbour first
+        - vertices at max_depth are yielded but not expanded
+        - the walk ends right after a vertex for which stop_when(vertex) is True
+        - with_info yields (vertex, depth, parent) with depth in hops from v_start
+        - reverse follows edges backwards, visiting everything that can reach v_start
+        """
+        if not self._has_vertex(v_start):
+            return
 
-                vertex_index += 1
+        neighbours = self._in_edges if reverse else self._out_edges
+        visited = bytearray(self.v_count)
+        visited[v_start] = 1
+        queue = deque([(v_start, 0)])
+        yield (v_start, 0, None) if with_info else v_start
+        if stop_when is not None and stop_when(v_start):
+            return
 
-        return reachable_vertices
+        # as long as the queue is not empty
+        while queue:
+            vertex, depth = queue.popleft()
+            if max_depth is not None and depth >= max_depth:
+                continue
+
+            for vertex_index, _ in neighbours(vertex):
+                if not visited[vertex_index]:
+                    visited[vertex_index] = 1
+                    queue.append((vertex_index, depth + 1))
+                    yield (vertex_index, depth + 1, vertex) if with_info else vertex_index
+
+                    if stop_when is not None and stop_when(vertex_index):
+                        return
 
     def has_cycle(self):
         """
         Return True if graph contains a cycle, False otherwise
         """
-        available_vertices = self.get_vertices()
-        for vertex in available_vertices:
-            # set the parent and go digging to find the children
-            parent = vertex
-            vertex_index = 0
-            for _ in self.adj_matrix[vertex]:
-                # if there is a connector, find the vertex then perform dfs. if parent is in dfs, return True
-                if self.adj_matrix[vertex][vertex_index] != 0:
-                    dfs = self.dfs(vertex_index)
-                    if parent in dfs:
+        if self._topo is not None:
+            return self._topo.has_cycle()
+
+        # 0 = not seen yet, 1 = on the current dfs path, 2 = finished
+        colour = bytearray(self.v_count)
+        for root in range(self.v_count):
+            if colour[root]:
+                continue
+            colour[root] = 1
+            stack = [(root, iter(self._out_edges(root)))]
+
+            while stack:
+                vertex, neighbours = stack[-1]
+                for dst, _ in neighbours:
+                    # an edge back onto the current path closes a cycle
+                    if colour[dst] == 1:
                         return True
-                vertex_index += 1
+                    if colour[dst] == 0:
+                        colour[dst] = 1
+                        stack.append((dst, iter(self._out_edges(dst))))
+                        break
+                else:
+                    colour[vertex] = 2
+                    stack.pop()
 
         return False
 
-    def dijkstra(self, src: int) -> []:
-        """
-        Find the shortest path between two points
-        """
-        # set the initial matrix
-        distance = []
-        for _ in self.get_vertices():
-            distance.append(0)
-
-        # create visited and priority queue
-        visited = [src]
-        priority_queue = [src]
-
-        while priority_queue.__len__() > 0:
-            priority_queue_value = priority_queue.pop()
-            priority_queue_dist = distance[priority_queue_value]
-            visited.append(priority_queue_value)
-
-            # find the next set of values to test
-            next_set = []
-            next_set_index = 0
-
-            for _ in self.adj_matrix[priority_queue_value]:
-                if self.adj_matrix[priority_queue_value][next_set_index] != 0:
-                    next_set.append(next_set_index)
-                next_set_index += 1
-
-            saved_distance = priority_queue_dist
-            # test each value to the point in the graph
-            for vertex in next_set:
-                # make sure distance is reset at each iteration
-                priority_queue_dist = saved_distance
-                # set the new distance
-                new_distance = priority_queue_dist + self.adj_matrix[priority_queue_value][vertex]
-                if distance[vertex] == 0 or distance[vertex] > new_distance:
-                    distance[vertex] = new_distance
-                    priority_queue.append(vertex)
-
-        # make values inf if they do not exist and replace 0
-        mapping_key = 0
-        for _ in distance:
-            if mapping_key != src and distance[mapping_key] == 0:
-                distance[mapping_key] = float('inf')
-            elif mapping_key == src:
-                distance[mapping_key] = 0
-            mapping_key += 1
+    def topological_sort(self) -> []:
+        """
+        Return the vertices in topological order (Kahn's algorithm), None if the graph has a cycle
+        """
+        in_degree = [0] * self.v_count
+        for src in range(self.v_count):
+            for dst, _ in self._out_edges(src):
+                in_degree[dst] += 1
+
+        ready = deque(v for v in range(self.v_count) if in_degree[v] == 0)
+        order = []
+        while ready:
+            vertex = ready.popleft()
+            order.append(vertex)
+            for dst, _ in self._out_edges(vertex):
+                in_degree[dst] -= 1
+                if in_degree[dst] == 0:
+                    ready.append(dst)
+
+        # vertices on a cycle never reach in degree 0
+        if len(order) != self.v_count:
+            return None
+        return order
+
+    def strongly_connected_components(self) -> array:
+        """
+        Label every vertex with its strongly connected component (iterative Tarjan, O(V + E))
+        Returns an array of labels 0 .. count - 1 where label[v] is the component of v.
+        Labels follow a topological order of the components, so every edge between two
+        components goes from a smaller label to a larger one
+        """
+        index = [-1] * self.v_count
+        low = [0] * self.v_count
+        on_stack = bytearray(self.v_count)
+        stack = []
+        found = [0] * self.v_count
+        count = 0
+        counter = 0
+
+        for root in range(self.v_count):
+            if index[root] != -1:
+                continue
+
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = 1
+            # each entry is a vertex and an iterator over the edges it still has to look at
+            work = [(root, iter(self._out_edges(root)))]
+
+            while work:
+                vertex, edges = work[-1]
+                for dst, _ in edges:
+                    if index[dst] == -1:
+                        index[dst] = low[dst] = counter
+                        counter += 1
+                        stack.append(dst)
+                        on_stack[dst] = 1
+                        work.append((dst, iter(self._out_edges(dst))))
+                        break
+                    if on_stack[dst] and index[dst] < low[vertex]:
+                        low[vertex] = index[dst]
+                else:
+                    # every edge of vertex is done, hand its low link up to the parent
+                    work.pop()
+                    if work and low[vertex] < low[work[-1][0]]:
+                        low[work[-1][0]] = low[vertex]
+
+                    # vertex is the root of a component, pop the whole component off the stack
+                    if low[vertex] == index[vertex]:
+                        while True:
+                            member = stack.pop()
+                            on_stack[member] = 0
+                            found[member] = count
+                            if member == vertex:
+                                break
+                        count += 1
+
+        # Tarjan finds components sinks first, flip the numbers to get a topological order
+        return array('q', [count - 1 - label for label in found])
+
+    def condensation(self) -> (array, 'DirectedGraph'):
+        """
+        Return (labels, dag) where labels is strongly_connected_components() and dag has one
+        vertex per component with an edge wherever an edge crosses between two components.
+        The edge weight is the smallest weight of the edges it stands for.
+        dag is the same class as the graph and label order is already a topological order of it
+        """
+        labels = self.strongly_connected_components()
+        count = max(labels) + 1 if labels else 0
+
+        rows = [{} for _ in range(count)]
+        for src in range(self.v_count):
+            row = rows[labels[src]]
+            for dst, weight in self._out_edges(src):
+                target = labels[dst]
+                if target != labels[src] and (target not in row or weight < row[target]):
+                    row[target] = weight
+
+        offsets = array('q', [0])
+        targets = array('q')
+        weights = []
+        for row in rows:
+            for target in sorted(row):
+                targets.append(target)
+                weights.append(row[target])
+            offsets.append(len(targets))
+
+        dag = type(self)()
+        dag._load_csr(offsets, targets, weights)
+        return labels, dag
+
+    def track_acyclicity(self, enabled: bool = True) -> None:
+        """
+        Keep a topological order up to date across add_edge() / remove_edge()
+        so has_cycle() after each insertion only looks at the affected part of the graph
+        """
+        self._topo = _TopologicalOrder(self) if enabled else None
+
+    def dijkstra(self, src: int, targets=None) -> []:
+        """
+        Find the shortest distance from src to every vertex (inf if unreachable)
+        If targets are given the search stops once all of them are settled,
+        any vertex not settled by then is left at inf
+        """
+        distance, _ = self.dijkstra_tree(src, targets)
+        return distance
+
+    def dijkstra_tree(self, src: int, targets=None) -> ([], []):
+        """
+        Return (distance, previous) lists of the shortest path tree from src
+        previous[v] is the vertex before v on its shortest path, None for src and unreached vertices
+        """
+        distance = [float('inf')] * self.v_count
+        previous = [None] * self.v_count
+        settled = list(self._iter_dijkstra(src, targets, distance, previous))
+
+        # an early exit can leave tentative distances behind, only keep settled ones
+        if targets is not None:
+            _keep_settled(distance, previous, settled)
+
+        return distance, previous
+
+    async def adijkstra(self, src: int, targets=None, yield_every: int = graph_async.DEFAULT_YIELD_EVERY,
+                        deadline=None, executor=None) -> []:
+        """
+        Async dijkstra() that lets the event loop run every yield_every settled vertices, same options as adfs()
+        """
+        if executor is not None:
+            return await graph_async.offload(self, executor, deadline, 'dijkstra', src, targets)
+
+        distance = [float('inf')] * self.v_count
+        previous = [None] * self.v_count
+        settled = await graph_async.collect(self, self._iter_dijkstra(src, targets, distance, previous),
+                                            yield_every, deadline)
+        if targets is not None:
+            _keep_settled(distance, previous, settled)
+        return distance
+
+    def shortest_path(self, src: int, dst: int, method: str = 'dijkstra', heuristic=None) -> (int, []):
+        """
+        Return (distance, path) of the shortest path from src to dst
+        The path is empty and the distance inf if dst cannot be reached
+        - method='dijkstra' searches outwards from src until dst is settled
+        - method='bidirectional' searches from both ends at once and usually settles far fewer vertices
+        - method='astar' orders the search by distance + heuristic(vertex, dst), which must never
+          overestimate the remaining distance (no heuristic behaves like dijkstra)
+        """
+        if method not in ('dijkstra', 'bidirectional', 'astar'):
+            raise ValueError(f'unknown shortest path method {method!r}')
+        if not (0 <= src < self.v_count and 0 <= dst < self.v_count):
+            return float('inf'), []
+        if src == dst:
+            return 0, [src]
+
+        if method == 'bidirectional':
+            return self._bidirectional_path(src, dst)
+        if method == 'astar':
+            return self._astar_path(src, dst, heuristic)
+
+        distance, previous = self.dijkstra_tree(src, [dst])
+        if distance[dst] == float('inf'):
+            return distance[dst], []
+        return distance[dst], _walk_back(previous, dst)
+
+    def _bidirectional_path(self, src: int, dst: int) -> (int, []):
+        """
+        Alternate a forward search from src and a backward search from dst over the reverse
+        edges, stopping once the two frontiers together cannot beat the best meeting point
+        """
+        # index 0 is the forward search, index 1 the backward one
+        distance = ({src: 0}, {dst: 0})
+        previous = ({src: None}, {dst: None})
+        settled = (set(), set())
+        heaps = ([(0, src)], [(0, dst)])
+        neighbours = (self._out_edges, self._in_edges)
+        push, pop = self._heap_push, self._heap_pop
+        best, meeting = float('inf'), None
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+
+            # grow whichever side has the closer frontier
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            dist, vertex = pop(heaps[side])
+            if vertex in settled[side]:
+                continue
+            settled[side].add(vertex)
+
+            mine, theirs = distance[side], distance[1 - side]
+            for nxt, weight in neighbours[side](vertex):
+                new_distance = dist + weight
+                if new_distance < mine.get(nxt, float('inf')):
+                    mine[nxt] = new_distance
+                    previous[side][nxt] = vertex
+                    push(heaps[side], (new_distance, nxt))
+                if nxt in theirs and mine[nxt] + theirs[nxt] < best:
+                    best, meeting = mine[nxt] + theirs[nxt], nxt
+
+        if meeting is None:
+            return float('inf'), []
+
+        # src .. meeting from the forward tree, then meeting .. dst from the backward tree
+        path = _walk_back(previous[0], meeting)
+        vertex = previous[1][meeting]
+        while vertex is not None:
+            path.append(vertex)
+            vertex = previous[1][vertex]
+        return best, path
+
+    def _astar_path(self, src: int, dst: int, heuristic) -> (int, []):
+        """
+        A* search, a vertex is expanded again if a shorter way to it turns up later,
+        so an admissible heuristic that is not consistent still gives the right answer
+        """
+        if heuristic is None:
+            heuristic = _no_estimate
+
+        distance = {src: 0}
+        previous = {src: None}
+        heap = [(heuristic(src, dst), 0, src)]
+        push, pop = self._heap_push, self._heap_pop
+
+        while heap:
+            _, dist, vertex = pop(heap)
+            if dist > distance[vertex]:
+                continue
+            if vertex == dst:
+                return dist, _walk_back(previous, dst)
+
+            for nxt, weight in self._out_edges(vertex):
+                new_distance = dist + weight
+                if new_distance < distance.get(nxt, float('inf')):
+                    distance[nxt] = new_distance
+                    previous[nxt] = vertex
+                    push(heap, (new_distance + heuristic(nxt, dst), new_distance, nxt))
+
+        return float('inf'), []
+
+    def dijkstra_many(self, sources, workers=None):
+        """
+        Yield (src, distance list) for every source in order, same answers as dijkstra(src)
+        With workers > 1 the sources are spread over a process pool. The graph is put
+        in shared memory once as CSR arrays, so no task has to pickle the graph
+        """
+        sources = list(sources)
+        if workers is None or workers <= 1 or len(sources) <= 1:
+            for src in sources:
+                yield src, self.dijkstra(src)
+            return
+
+        blocks = []
+        try:
+            # copy each CSR array into its own shared memory block
+            for values in self._csr_arrays():
+                size = values.itemsize * len(values)
+                block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+                block.buf[:size] = values.tobytes()
+                blocks.append((block, values.typecode, len(values)))
+
+            layout = [(block.name, typecode, length) for block, typecode, length in blocks]
+            chunk_size = max(1, len(sources) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach_shared_csr,
+                                     initargs=(layout,)) as pool:
+                for src, distance in zip(sources, pool.map(_shared_dijkstra, sources, chunksize=chunk_size)):
+                    yield src, distance
+        finally:
+            for block, _, _ in blocks:
+                block.close()
+                block.unlink()
+
+    @classmethod
+    def from_edges(cls, edges):
+        """
+        Build a graph from (src, dst, weight) or (src, dst) tuples in one pass
+        Works on any iterable, including generators, and follows the constructor rules:
+        vertices go up to the largest id seen, self-loops are dropped and the last weight for an edge wins
+        """
+        graph = cls()
+        graph._load_csr(*_bulk_csr(edges))
+        return graph
+
+    @classmethod
+    def from_edge_file(cls, source, delimiter: str = ','):
+        """
+        Build a graph from a CSV (or TSV with delimiter='\\t') file of src, dst[, weight] lines
+        source is a path or an open text file, lines are streamed rather than read in one go
+        """
+        return cls.from_edges(_parse_edge(fields) for fields in graph_io.read_edge_file(source, delimiter))
+
+    def add_edges_bulk(self, edges) -> None:
+        """
+        Add many (src, dst, weight) or (src, dst) edges, same rules as add_edge()
+        """
+        for edge in edges:
+            self.add_edge(edge[0], edge[1], edge[2] if len(edge) > 2 else 1)
+
+    def save(self, path) -> None:
+        """
+        Write the graph to path in the compact binary format of graph_io
+        The file holds one weight type, so if any weight is a float they are all written as floats
+        """
+        offsets, targets, weights = self._csr_arrays()
+        graph_io.write_graph(path, offsets, targets, weights, directed=True)
+
+    @classmethod
+    def load(cls, path, use_mmap: bool = True):
+        """
+        Read a graph written by save(), any directed graph class can load the file
+        """
+        image = graph_io.read_graph(path, use_mmap)
+        if not image.directed:
+            raise ValueError(f'{path} does not hold a directed graph')
+
+        graph = cls()
+        graph._load_csr(image.offsets, image.targets, image.weights)
+        return graph
+
+    def _load_csr(self, offsets, targets, weights) -> None:
+        """
+        Fill a new, empty graph straight from CSR arrays
+        """
+        self.v_count = len(offsets) - 1
+        self.adj_matrix = [[0] * self.v_count for _ in range(self.v_count)]
+        for src in range(self.v_count):
+            row = self.adj_matrix[src]
+            for index in range(offsets[src], offsets[src + 1]):
+                row[targets[index]] = weights[index]
+
+    def _csr_arrays(self) -> (array, array, array):
+        """
+        Return the graph as (offsets, targets, weights) arrays in compressed sparse row form
+        Weights are 'q' if they are all ints, otherwise 'd'
+        """
+        offsets, targets, weights = self._csr_rows()
+        return offsets, targets, _weight_array(weights)
+
+    def _csr_rows(self) -> (array, array, []):
+        """
+        Same as _csr_arrays() but with the weights in a list, each keeping the type it was given as
+        """
+        offsets = array('q', [0])
+        targets = array('q')
+        weights = []
+        for v in range(self.v_count):
+            for dst, weight in self._out_edges(v):
+                targets.append(dst)
+                weights.append(weight)
+            offsets.append(len(targets))
+
+        return offsets, targets, weights
+
+    def _iter_dijkstra(self, src: int, targets, distance: [], previous: []):
+        """
+        Settle vertices nearest first and yield each one as it is settled
+        distance and previous are filled in as the search goes, stale heap
+        entries are skipped when popped instead of doing a decrease-key
+        """
+        if not 0 <= src < self.v_count:
+            return
+
+        remaining = None
+        if targets is not None:
+            remaining = {v for v in targets if 0 <= v < self.v_count}
+
+        settled = bytearray(self.v_count)
+        distance[src] = 0
+        heap = [(0, src)]
+        push, pop = self._heap_push, self._heap_pop
+
+        while heap:
+            dist, vertex = pop(heap)
+            if settled[vertex]:
+                continue
+            settled[vertex] = 1
+            yield vertex
+
+            # stop once every target has its final distance
+            if remaining is not None:
+                remaining.discard(vertex)
+                if not remaining:
+                    return
+
+            for dst, weight in self._out_edges(vertex):
+                new_distance = dist + weight
+                if new_distance < distance[dst]:
+                    distance[dst] = new_distance
+                    previous[dst] = vertex
+                    push(heap, (new_distance, dst))
+
+
+class SparseDirectedGraph(DirectedGraph):
+    """
+    Directed weighted graph stored in compressed sparse row (CSR) form
+    - same rules and public methods as DirectedGraph
+    - memory is O(V + E) instead of O(V^2)
+    - add_edge() / remove_edge() go into a delta buffer that is folded back
+      into the CSR arrays once it grows past compact_threshold
+    """
+
+    compact_threshold = 1024
+
+    def __init__(self, start_edges=None):
+        """
+        Store graph info as offsets / targets / weights arrays plus a delta buffer
+        """
+        self.v_count = 0
+        # the out edges of v are targets[offsets[v]:offsets[v + 1]], sorted by destination
+        self._offsets = array('q', [0])
+        self._targets = array('q')
+        # weights keep whatever number type the caller passed in
+        self._weights = []
+        # pending changes as {src: {dst: weight}}, a weight of 0 marks a removed edge
+        self._delta = {}
+        self._delta_size = 0
+
+        # populate graph with initial vertices and edges (if provided)
+        if start_edges is not None:
+            self._load_csr(*_bulk_csr(start_edges))
+            # like DirectedGraph, an empty edge list still makes vertex 0
+            if self.v_count == 0:
+                self.add_vertex()
+
+    def __str__(self):
+        """
+        Return content of the graph in the same form as DirectedGraph
+        """
+        if self.v_count == 0:
+            return 'EMPTY GRAPH\n'
+        out = '   |'
+        out += ' '.join(['{:2}'.format(i) for i in range(self.v_count)]) + '\n'
+        out += '-' * (self.v_count * 3 + 3) + '\n'
+        for i in range(self.v_count):
+            row = [0] * self.v_count
+            for dst, weight in self._out_edges(i):
+                row[dst] = weight
+            out += '{:2} |'.format(i)
+            out += ' '.join(['{:2}'.format(w) for w in row]) + '\n'
+        out = f"GRAPH ({self.v_count} vertices):\n{out}"
+        return out
+
+    def add_vertex(self) -> int:
+        """
+        add a vertex to the graph, the new row is empty so this is O(1)
+        """
+        # offsets loaded from a file are a read-only view, take a copy before growing it
+        if not isinstance(self._offsets, array):
+            self._offsets = array('q', self._offsets)
+        self._offsets.append(self._offsets[-1])
+        self.v_count += 1
+        self._vertex_added()
+        return self.v_count
+
+    def add_edge(self, src: int, dst: int, weight=1) -> None:
+        """
+        Add an edge to the graph
+        """
+        if 0 <= src < self.v_count and 0 <= dst < self.v_count and src != dst:
+            self._set_pending(src, dst, weight)
+            self._edge_changed(src, dst, weight)
+
+    def remove_edge(self, src: int, dst: int) -> None:
+        """
+        Remove an edge from the graph
+        """
+        if self._edge_weight(src, dst) != 0:
+            self._set_pending(src, dst, 0)
+            self._edge_changed(src, dst, 0)
+
+    def compact(self) -> None:
+        """
+        Fold the delta buffer into fresh CSR arrays in O(V + E)
+        """
+        self._offsets, self._targets, self._weights = self._merged_rows()
+        self._delta = {}
+        self._delta_size = 0
+
+    def copy(self) -> 'SparseDirectedGraph':
+        """
+        Return an independent graph with its own copy of the arrays and pending changes
+        Nothing is compacted, so copying a graph other threads are reading is safe
+        """
+        graph = type(self)()
+        graph.v_count = self.v_count
+        graph._offsets = array('q', self._offsets)
+        graph._targets = array('q', self._targets)
+        graph._weights = list(self._weights)
+        graph._delta = {src: dict(pending) for src, pending in self._delta.items()}
+        graph._delta_size = self._delta_size
+        return graph
+
+    def _merged_rows(self) -> (array, array, []):
+        """
+        Build new offsets / targets arrays and a weights list with the delta buffer folded in
+        """
+        offsets = array('q', [0])
+        targets = array('q')
+        weights = []
+        for v in range(self.v_count):
+            for dst, weight in self._out_edges(v):
+                targets.append(dst)
+                weights.append(weight)
+            offsets.append(len(targets))
+        return offsets, targets, weights
+
+    def add_edges_bulk(self, edges) -> None:
+        """
+        Add many edges with a single compaction at the end, same rules as add_edge()
+        """
+        # incremental indexes need to see every edge, so take the slow path for them
+        if self._topo is not None:
+            super().add_edges_bulk(edges)
+            return
+
+        for edge in edges:
+            src, dst = edge[0], edge[1]
+            if 0 <= src < self.v_count and 0 <= dst < self.v_count and src != dst:
+                pending = self._delta.setdefault(src, {})
+                if dst not in pending:
+                    self._delta_size += 1
+                pending[dst] = edge[2] if len(edge) > 2 else 1
+        # cheaper to rebuild the reverse index on its next use than to patch it edge by edge
+        self._reverse = None
+        self._version += 1
+        self.compact()
+
+    def _csr_arrays(self) -> (array, array, array):
+        """
+        Return the CSR arrays with any pending changes folded in, the graph itself is left as it is
+        """
+        if self._delta:
+            offsets, targets, weights = self._merged_rows()
+            return offsets, targets, _weight_array(weights)
+        if isinstance(self._weights, memoryview):
+            # still the read-only views of a loaded file, hand out copies
+            return array('q', self._offsets), array('q', self._targets), array(self._weights.format, self._weights)
+        return self._offsets, self._targets, _weight_array(self._weights)
+
+    def _load_csr(self, offsets, targets, weights) -> None:
+        """
+        Use the CSR arrays as they are, for a memory mapped file nothing is copied
+        """
+        self.v_count = len(offsets) - 1
+        self._offsets = offsets
+        self._targets = targets
+        self._weights = weights
+
+    def _move_last_vertex(self, v: int, out_edges: [], in_edges: []) -> None:
+        """
+        Give the edges of the last vertex to v through the delta buffer, then cut the
+        last row off the end of the CSR arrays, which is O(degree) rather than O(E)
+        """
+        last = self.v_count - 1
+        if v != last:
+            for dst, weight in out_edges:
+                self._set_pending(v, dst, weight)
+            for src, weight in in_edges:
+                self._set_pending(src, v, weight)
+                self._set_pending(src, last, 0)
+
+        # the row of the last vertex is empty now, so its pending changes can go
+        self._delta_size -= len(self._delta.pop(last, ()))
+        end = self._offsets[last]
+        self._offsets = _truncated(self._offsets, last + 1)
+        self._targets = _truncated(self._targets, end)
+        self._weights = _truncated(self._weights, end)
+        self.v_count -= 1
+
+    def _set_pending(self, src: int, dst: int, weight) -> None:
+        """
+        Record an edge change in the delta buffer, compacting when it gets too big
+        """
+        pending = self._delta.setdefault(src, {})
+        if dst not in pending:
+            self._delta_size += 1
+        pending[dst] = weight
+
+        if self._delta_size > max(self.compact_threshold, len(self._targets) // 4):
+            self.compact()
+
+    def _edge_lookup(self):
+        """
+        Hash each row the first time a batch asks about it, so later hops are O(1)
+        """
+        rows = {}
+
+        def has_edge(src: int, dst: int) -> bool:
+            row = rows.get(src)
+            if row is None:
+                row = rows[src] = {target for target, _ in self._out_edges(src)}
+            return dst in row
+
+        return has_edge
+
+    def _out_edges(self, v: int) -> []:
+        """
+        Return (destination, weight) pairs leaving v in ascending destination order
+        """
+        start, end = self._offsets[v], self._offsets[v + 1]
+        pending = self._delta.get(v)
+        if not pending:
+            return list(zip(self._targets[start:end], self._weights[start:end]))
+
+        # merge the pending changes over the stored row
+        row = dict(zip(self._targets[start:end], self._weights[start:end]))
+        row.update(pending)
+        return sorted((dst, weight) for dst, weight in row.items() if weight != 0)
+
+    def _edge_weight(self, src: int, dst: int) -> int:
+        """
+        Return the weight of the edge src -> dst, 0 if there is no edge
+        """
+        if not (0 <= src < self.v_count and 0 <= dst < self.v_count):
+            return 0
+
+        pending = self._delta.get(src)
+        if pending and dst in pending:
+            return pending[dst]
+
+        # binary search the sorted row
+        start, end = self._offsets[src], self._offsets[src + 1]
+        index = bisect_left(self._targets, dst, start, end)
+        if index < end and self._targets[index] == dst:
+            return self._weights[index]
+        return 0
+
+
+class NumpyDirectedGraph(DirectedGraph):
+    """
+    Directed weighted graph stored in a NumPy matrix (needs numpy installed)
+    - same rules and public methods as DirectedGraph
+    - neighbour scans and get_edges() are vectorized calls instead of Python loops
+    - the matrix keeps spare capacity that doubles when it fills up, so
+      add_vertex() does not copy the whole matrix every time
+    - adds all_pairs_shortest_paths() and transitive_closure() as batched array operations
+    """
+
+    def __init__(self, start_edges=None, dtype=None):
+        """
+        Store graph info as a square NumPy matrix, the top left v_count x v_count block is in use
+        """
+        if np is None:
+            raise ImportError('NumpyDirectedGraph needs numpy installed')
+
+        self.v_count = 0
+        self._matrix = np.zeros((0, 0), dtype=dtype or np.int64)
+
+        # populate graph with initial vertices and edges (if provided)
+        if start_edges is not None:
+            self._load_csr(*_bulk_csr(start_edges))
+            # like DirectedGraph, an empty edge list still makes vertex 0
+            if self.v_count == 0:
+                self.add_vertex()
+
+    @property
+    def adj_matrix(self):
+        """
+        The part of the matrix in use, a view so writes go straight into the graph
+        """
+        return self._matrix[:self.v_count, :self.v_count]
+
+    def copy(self) -> 'NumpyDirectedGraph':
+        """
+        Return an independent graph with a copy of the matrix, dtype included
+        """
+        graph = type(self)(dtype=self._matrix.dtype)
+        graph.v_count = self.v_count
+        graph._matrix = self.adj_matrix.copy()
+        return graph
+
+    def add_vertex(self) -> int:
+        """
+        add a vertex to the graph, growing the matrix to double its size when it is full
+        """
+        if self.v_count == len(self._matrix):
+            capacity = max(4, 2 * self.v_count)
+            grown = np.zeros((capacity, capacity), dtype=self._matrix.dtype)
+            grown[:self.v_count, :self.v_count] = self.adj_matrix
+            self._matrix = grown
+
+        # spare rows and columns are always zero, so the new vertex starts with no edges
+        self.v_count += 1
+        self._vertex_added()
+        return self.v_count
+
+    def add_edge(self, src: int, dst: int, weight=1) -> None:
+        """
+        Add an edge, switching the matrix to a wider dtype first if the weight does not fit
+        """
+        if 0 <= src < self.v_count and 0 <= dst < self.v_count and src != dst:
+            self._fit_weight(weight)
+            self._matrix[src, dst] = weight
+            # the index gets the weight as stored, so both always agree
+            self._edge_changed(src, dst, self._matrix[src, dst].item())
+
+    def _fit_weight(self, weight) -> None:
+        """
+        Switch the matrix to int64, or failing that float64, if weight cannot be stored exactly in its dtype
+        """
+        dtype = self._matrix.dtype
+        try:
+            if dtype.type(weight) == weight:
+                return
+        except (OverflowError, TypeError, ValueError):
+            pass
+
+        for wider in (np.dtype(np.int64), np.dtype(np.float64)):
+            if not np.can_cast(dtype, wider):
+                continue
+            try:
+                stored = wider.type(weight)
+            except (OverflowError, TypeError, ValueError):
+                continue
+            # float64 is the widest there is, close enough is all it can do
+            if stored == weight or wider.kind == 'f':
+                self._matrix = self._matrix.astype(wider)
+                return
+        raise TypeError(f'edge weight {weight!r} cannot be stored')
+
+    def _move_last_vertex(self, v: int, out_edges: [], in_edges: []) -> None:
+        """
+        Copy the row and column of the last vertex over v with two slice assignments
+        """
+        last = self.v_count - 1
+        matrix = self._matrix
+        if v != last:
+            matrix[v, :last + 1] = matrix[last, :last + 1]
+            matrix[:last + 1, v] = matrix[:last + 1, last]
+        # spare rows and columns have to stay zero for add_vertex()
+        matrix[last, :] = 0
+        matrix[:, last] = 0
+        self.v_count -= 1
+
+    def _load_csr(self, offsets, targets, weights) -> None:
+        """
+        Fill a new, empty graph from CSR arrays with one vectorized scatter
+        """
+        values = np.asarray(weights)
+        if values.dtype.kind not in 'iuf':
+            # ints too big for int64
+            values = values.astype(np.float64)
+        offsets = np.frombuffer(offsets, dtype=np.int64)
+        self.v_count = len(offsets) - 1
+
+        # widen the matrix like add_edge() does if any weight does not fit its dtype
+        dtype = self._matrix.dtype
+        if values.dtype.kind == 'f' and len(values):
+            dtype = np.dtype(np.float64)
+        elif len(values) and dtype.kind in 'iu':
+            limits = np.iinfo(dtype)
+            if values.min() < limits.min or values.max() > limits.max:
+                dtype = np.dtype(np.int64)
+
+        self._matrix = np.zeros((self.v_count, self.v_count), dtype=dtype)
+        sources = np.repeat(np.arange(self.v_count), np.diff(offsets))
+        self._matrix[sources, np.frombuffer(targets, dtype=np.int64)] = values
+
+    def get_edges(self) -> []:
+        """
+        Get the edges on the graph in one vectorized scan
+        """
+        matrix = self.adj_matrix
+        sources, destinations = np.nonzero(matrix)
+        return list(zip(sources.tolist(), destinations.tolist(), matrix[sources, destinations].tolist()))
+
+    def all_pairs_shortest_paths(self):
+        """
+        Return a v_count x v_count float array of shortest distances (Floyd-Warshall)
+        Each of the V rounds is a single array operation, unreachable pairs are inf
+        """
+        matrix = self.adj_matrix
+        distance = np.where(matrix != 0, matrix, np.inf).astype(np.float64)
+        np.fill_diagonal(distance, 0)
+
+        for k in range(self.v_count):
+            np.minimum(distance, distance[:, k, None] + distance[None, k, :], out=distance)
 
         return distance
 
+    def transitive_closure(self):
+        """
+        Return a v_count x v_count bool array, [u, v] is True if v can be reached from u
+        Every vertex reaches itself, the reach is squared until it stops changing
+        """
+        reach = (self.adj_matrix != 0) | np.eye(self.v_count, dtype=bool)
+
+        while True:
+            # float matmul goes through BLAS, any positive count means a path exists
+            as_float = reach.astype(np.float32)
+            step = (as_float @ as_float) > 0
+            if np.array_equal(step, reach):
+                return reach
+            reach = step
+
+    def _out_edges(self, v: int) -> []:
+        """
+        Return (destination, weight) pairs leaving v in ascending destination order
+        """
+        row = self._matrix[v, :self.v_count]
+        destinations = np.flatnonzero(row)
+        return list(zip(destinations.tolist(), row[destinations].tolist()))
+
+    def _edge_weight(self, src: int, dst: int) -> int:
+        """
+        Return the weight of the edge src -> dst, 0 if there is no edge
+        """
+        return self._matrix[src, dst].item()
+
+
+class CompactDirectedGraph(DirectedGraph):
+    """
+    Directed weighted graph in one flat typed array, for processes that hold many small graphs
+    - same rules and public methods as DirectedGraph
+    - row v of the matrix starts at v * capacity, so there are no per-row lists or boxed ints
+    - weights use the narrowest typecode that fits every weight stored so far,
+      widening from 'B' to 'H', 'I', 'q' and finally 'd' for floats
+    - the data lives in __slots__; DirectedGraph still gives instances a __dict__, which stays empty
+      unless the cache or instrumentation puts wrapped methods in it
+    - constructors size the matrix exactly, add_vertex() doubles the capacity when it is full
+    """
+
+    __slots__ = ('v_count', '_capacity', '_matrix', '_version', '_reverse', '_topo', '_cache', '_stats')
+
+    _typecodes = ('B', 'H', 'I', 'q', 'd')
+
+    def __init__(self, start_edges=None):
+        """
+        Store graph info as a flat capacity x capacity array
+        """
+        self.v_count = 0
+        self._capacity = 0
+        self._matrix = array('B')
+        self._version = 0
+        self._reverse = None
+        self._topo = None
+        self._cache = None
+        self._stats = None
+
+        # populate graph with initial vertices and edges (if provided)
+        if start_edges is not None:
+            self._load_csr(*_bulk_csr(start_edges))
+            # like DirectedGraph, an empty edge list still makes vertex 0
+            if self.v_count == 0:
+                self.add_vertex()
+
+    def __str__(self):
+        """
+        Return content of the graph in the same form as DirectedGraph
+        """
+        if self.v_count == 0:
+            return 'EMPTY GRAPH\n'
+        out = '   |'
+        out += ' '.join(['{:2}'.format(i) for i in range(self.v_count)]) + '\n'
+        out += '-' * (self.v_count * 3 + 3) + '\n'
+        for i in range(self.v_count):
+            row = self._row(i)
+            out += '{:2} |'.format(i)
+            out += ' '.join(['{:2}'.format(w) for w in row]) + '\n'
+        out = f"GRAPH ({self.v_count} vertices):\n{out}"
+        return out
+
+    @property
+    def adj_matrix(self) -> []:
+        """
+        Return the matrix as a list of row lists like DirectedGraph.adj_matrix (a copy)
+        """
+        return [list(self._row(v)) for v in range(self.v_count)]
+
+    def add_vertex(self) -> int:
+        """
+        add a vertex to the graph, spare capacity keeps this O(1) amortized
+        """
+        if self.v_count == self._capacity:
+            capacity = max(4, 2 * self._capacity)
+            grown = array(self._matrix.typecode, [0]) * (capacity * capacity)
+            for v in range(self.v_count):
+                grown[v * capacity:v * capacity + self.v_count] = self._row(v)
+            self._matrix = grown
+            self._capacity = capacity
+
+        # spare rows and columns are always zero, so the new vertex starts with no edges
+        self.v_count += 1
+        self._vertex_added()
+        return self.v_count
+
+    def add_edge(self, src: int, dst: int, weight=1) -> None:
+        """
+        Add an edge to the graph, widening the weight type if it does not fit
+        """
+        if 0 <= src < self.v_count and 0 <= dst < self.v_count and src != dst:
+            self._store(src * self._capacity + dst, weight)
+            self._edge_changed(src, dst, weight)
+
+    def remove_edge(self, src: int, dst: int) -> None:
+        """
+        Remove an edge from the graph
+        """
+        if 0 <= src < self.v_count and 0 <= dst < self.v_count and self._matrix[src * self._capacity + dst] != 0:
+            self._matrix[src * self._capacity + dst] = 0
+            self._edge_changed(src, dst, 0)
+
+    def _move_last_vertex(self, v: int, out_edges: [], in_edges: []) -> None:
+        """
+        Copy the row of the last vertex over v and move its column entries, O(V + in-degree)
+        """
+        last = self.v_count - 1
+        capacity, matrix = self._capacity, self._matrix
+        if v != last:
+            matrix[v * capacity:v * capacity + self.v_count] = self._row(last)
+            for src, weight in in_edges:
+                matrix[src * capacity + v] = weight
+
+        # spare rows and columns have to stay zero for add_vertex()
+        matrix[last * capacity:last * capacity + self.v_count] = array(matrix.typecode, [0]) * self.v_count
+        for src, _ in in_edges:
+            matrix[src * capacity + last] = 0
+        self.v_count -= 1
+
+    def _load_csr(self, offsets, targets, weights) -> None:
+        """
+        Fill a new, empty graph from CSR arrays, picking the weight type from the weights
+        """
+        self.v_count = self._capacity = len(offsets) - 1
+        self._matrix = array(self._typecode_for(weights), [0]) * (self.v_count * self.v_count)
+        for src in range(self.v_count):
+            base = src * self._capacity
+            for index in range(offsets[src], offsets[src + 1]):
+                self._matrix[base + targets[index]] = weights[index]
+
+    def _row(self, v: int) -> array:
+        """
+        Return the used part of row v as an array slice
+        """
+        start = v * self._capacity
+        return self._matrix[start:start + self.v_count]
+
+    def _out_edges(self, v: int) -> []:
+        """
+        Return (destination, weight) pairs leaving v in ascending destination order
+        """
+        return [(dst, weight) for dst, weight in enumerate(self._row(v)) if weight != 0]
+
+    def _edge_weight(self, src: int, dst: int) -> int:
+        """
+        Return the weight of the edge src -> dst, 0 if there is no edge
+        """
+        return self._matrix[src * self._capacity + dst]
+
+    def _store(self, index: int, weight) -> None:
+        """
+        Write one weight, switching the whole matrix to a wider typecode first if it does not fit
+        """
+        try:
+            self._matrix[index] = weight
+            return
+        except (OverflowError, TypeError):
+            pass
+
+        for typecode in self._typecodes[self._typecodes.index(self._matrix.typecode) + 1:]:
+            try:
+                array(typecode, [weight])
+            except (OverflowError, TypeError):
+                continue
+            self._matrix = array(typecode, self._matrix)
+            self._matrix[index] = weight
+            return
+        raise TypeError(f'edge weight {weight!r} cannot be stored')
+
+    @classmethod
+    def _typecode_for(cls, weights) -> str:
+        """
+        Return the narrowest typecode that holds every weight
+        """
+        if not all(isinstance(weight, int) for weight in weights):
+            return 'd'
+        low, high = min(weights, default=0), max(weights, default=0)
+        if low < 0:
+            return 'q'
+        for typecode in cls._typecodes[:3]:
+            if high >> (8 * array(typecode).itemsize) == 0:
+                return typecode
+        return 'q'
+
+
+def _bulk_csr(edges) -> (array, array, []):
+    """
+    Turn (src, dst[, weight]) tuples into sorted, deduplicated CSR arrays in one pass
+    Vertices go up to the largest id seen, self-loops and negative ids are dropped,
+    the last weight given for an edge wins and a weight of 0 means no edge.
+    The weights come back as a list so each keeps its own type, like add_edge() stores it
+    """
+    sources, destinations, weights = array('q'), array('q'), []
+    v_count = 0
+    for edge in edges:
+        src, dst = edge[0], edge[1]
+        v_count = max(v_count, src + 1, dst + 1)
+        if src != dst and src >= 0 and dst >= 0:
+            sources.append(src)
+            destinations.append(dst)
+            weights.append(edge[2] if len(edge) > 2 else 1)
+
+    # counting sort by source, edges keep their input order inside each row
+    starts = [0] * (v_count + 1)
+    for src in sources:
+        starts[src + 1] += 1
+    for v in range(v_count):
+        starts[v + 1] += starts[v]
+    slots = starts[:-1]
+    row_targets = array('q', bytes(8 * len(sources)))
+    row_weights = [0] * len(sources)
+    for src, dst, weight in zip(sources, destinations, weights):
+        row_targets[slots[src]] = dst
+        row_weights[slots[src]] = weight
+        slots[src] += 1
+
+    # dedupe each row (a later weight overwrites an earlier one) and sort it by destination
+    offsets = array('q', [0])
+    targets = array('q')
+    row_weights_out = []
+    for v in range(v_count):
+        row = dict(zip(row_targets[starts[v]:starts[v + 1]], row_weights[starts[v]:starts[v + 1]]))
+        for dst in sorted(row):
+            if row[dst] != 0:
+                targets.append(dst)
+                row_weights_out.append(row[dst])
+        offsets.append(len(targets))
+
+    return offsets, targets, row_weights_out
+
+
+def _truncated(values, length: int):
+    """
+    Cut an array, list or memoryview down to length, views are sliced so no data is copied
+    """
+    if isinstance(values, memoryview):
+        return values[:length]
+    del values[length:]
+    return values
+
+
+def _keep_settled(distance: [], previous: [], settled: []) -> None:
+    """
+    Put every vertex that is not in settled back to inf / None
+    """
+    keep = bytearray(len(distance))
+    for vertex in settled:
+        keep[vertex] = 1
+    for vertex in range(len(distance)):
+        if not keep[vertex]:
+            distance[vertex] = float('inf')
+            previous[vertex] = None
+
+
+def _walk_back(previous, vertex: int) -> []:
+    """
+    Follow previous links back from vertex and return the path in forward order
+    previous is a list or dict, holding None for the start of the path
+    """
+    path = [vertex]
+    while previous[path[-1]] is not None:
+        path.append(previous[path[-1]])
+    path.reverse()
+    return path
+
+
+def _no_estimate(vertex: int, dst: int) -> int:
+    """
+    A* heuristic that knows nothing, turns the search into plain dijkstra
+    """
+    return 0
+
+
+def _parse_edge(fields: []) -> tuple:
+    """
+    Turn the text fields of one edge file line into (src, dst[, weight])
+    """
+    if len(fields) > 2:
+        weight = fields[2]
+        try:
+            weight = int(weight)
+        except ValueError:
+            weight = float(weight)
+        return int(fields[0]), int(fields[1]), weight
+    return int(fields[0]), int(fields[1])
+
+
+def _weight_array(weights: []) -> array:
+    """
+    Pack edge weights into an int array if they are all ints, otherwise a float array
+    """
+    if all(isinstance(weight, int) for weight in weights):
+        return array('q', weights)
+    return array('d', weights)
+
+
+def _csr_dijkstra(offsets, targets, weights, src: int) -> []:
+    """
+    Heap Dijkstra straight over CSR arrays, used by the dijkstra_many() workers
+    """
+    v_count = len(offsets) - 1
+    distance = [float('inf')] * v_count
+    if not 0 <= src < v_count:
+        return distance
+
+    settled = bytearray(v_count)
+    distance[src] = 0
+    heap = [(0, src)]
+    while heap:
+        dist, vertex = heappop(heap)
+        if settled[vertex]:
+            continue
+        settled[vertex] = 1
+
+        for index in range(offsets[vertex], offsets[vertex + 1]):
+            dst = targets[index]
+            new_distance = dist + weights[index]
+            if new_distance < distance[dst]:
+                distance[dst] = new_distance
+                heappush(heap, (new_distance, dst))
+
+    return distance
+
+
+# the shared memory blocks and typed views a dijkstra_many() worker process reads from
+_shared_csr = None
+
+
+def _attach_shared_csr(layout: []) -> None:
+    """
+    Worker start up: map the shared CSR blocks without copying them
+    """
+    global _shared_csr
+    blocks, views = [], []
+    for name, typecode, length in layout:
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        views.append(block.buf[:length * array(typecode).itemsize].cast(typecode))
+    _shared_csr = (blocks, views)
+
+
+def _shared_dijkstra(src: int) -> []:
+    """
+    Worker task: distances from src over the shared graph
+    """
+    offsets, targets, weights = _shared_csr[1]
+    return _csr_dijkstra(offsets, targets, weights, src)
+
+
+class _TopologicalOrder:
+    """
+    Topological order of a DirectedGraph kept up to date edge by edge (Pearce-Kelly)
+    - an inserted edge that already agrees with the order costs O(1)
+    - otherwise only vertices between the two endpoints in the order are searched
+    - removing an edge never breaks the order, but once a cycle exists the
+      next has_cycle() after a removal rebuilds everything in O(V + E)
+    """
+
+    def __init__(self, graph):
+        """
+        Build the order from the current graph, predecessors come from the graph's reverse index
+        """
+        self.graph = graph
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        """
+        Recompute everything from scratch in O(V + E)
+        """
+        graph = self.graph
+        order = graph.topological_sort()
+        self.cyclic = order is None
+        self.stale = False
+        # while there is a cycle the positions are not used, any order will do
+        self.order = order if order is not None else list(range(graph.v_count))
+        self.position = [0] * graph.v_count
+        for index, vertex in enumerate(self.order):
+            self.position[vertex] = index
+
+    def has_cycle(self) -> bool:
+        """
+        Return True if the tracked graph contains a cycle
+        """
+        if self.stale:
+            self.rebuild()
+        return self.cyclic
+
+    def vertex_added(self) -> None:
+        """
+        A new vertex has no edges so it can go at the end of the order
+        """
+        self.position.append(len(self.order))
+        self.order.append(self.graph.v_count - 1)
+
+    def vertex_removed(self, v: int, last: int) -> None:
+        """
+        v lost all its edges and the last vertex was renumbered to v,
+        so v takes over the slot of last and the old slot of v is left empty
+        """
+        slot = self.position.pop()
+        if v != last:
+            self.order[self.position[v]] = None
+            self.position[v] = slot
+        self.order[slot] = v if v != last else None
+
+    def edge_added(self, src: int, dst: int) -> None:
+        """
+        Repair the order after src -> dst was inserted
+        """
+        if self.cyclic or self.position[src] < self.position[dst]:
+            return
+
+        lower, upper = self.position[dst], self.position[src]
+
+        # everything reachable from dst that sits at or before src in the order
+        forward = [dst]
+        seen = {dst}
+        stack = [dst]
+        while stack:
+            vertex = stack.pop()
+            for nxt, _ in self.graph._out_edges(vertex):
+                if nxt == src:
+                    self.cyclic = True
+                    return
+                if nxt not in seen and self.position[nxt] < upper:
+                    seen.add(nxt)
+                    forward.append(nxt)
+                    stack.append(nxt)
+
+        # everything that reaches src and sits after dst in the order
+        backward = [src]
+        seen = {src}
+        stack = [src]
+        while stack:
+            vertex = stack.pop()
+            for prev in self.graph._reverse_index()[vertex]:
+                if prev not in seen and self.position[prev] > lower:
+                    seen.add(prev)
+                    backward.append(prev)
+                    stack.append(prev)
+
+        # reuse the same slots, putting the backward set ahead of the forward set
+        backward.sort(key=self.position.__getitem__)
+        forward.sort(key=self.position.__getitem__)
+        moved = backward + forward
+        slots = sorted(self.position[v] for v in moved)
+        for slot, vertex in zip(slots, moved):
+            self.position[vertex] = slot
+            self.order[slot] = vertex
+
+    def edge_removed(self, src: int, dst: int) -> None:
+        """
+        Drop src -> dst, a removal can only break a cycle so rebuild lazily if there was one
+        """
+        if self.cyclic:
+            self.stale = True
+
 
 if __name__ == '__main__':
 
@@ -348,3 +1770,48 @@ if __name__ == '__main__':
     print('\n', g)
     for i in range(5):
         print(f'DIJKSTRA {i} {g.dijkstra(i)}')
+
+
+    print("\nSparseDirectedGraph matches DirectedGraph")
+    print("-----------------------------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g, sparse = DirectedGraph(edges), SparseDirectedGraph(edges)
+    sparse.compact()
+    g.remove_edge(4, 3)
+    sparse.remove_edge(4, 3)
+    print(str(g) == str(sparse), g.get_edges() == sparse.get_edges())
+    for i in range(5):
+        print(i, g.dfs(i) == sparse.dfs(i), g.bfs(i) == sparse.bfs(i), g.dijkstra(i) == sparse.dijkstra(i))
+
+    print("\nshortest_path() example")
+    print("-----------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    for src, dst in [(0, 2), (2, 0), (3, 4), (1, 1)]:
+        print(f'{src} -> {dst}', g.shortest_path(src, dst), g.shortest_path(src, dst, 'bidirectional'),
+              g.shortest_path(src, dst, 'astar', lambda v, target: 0))
+
+    print("\npredecessors() / remove_vertex() example")
+    print("-----------------------------------------")
+    g = DirectedGraph(edges)
+    print([g.predecessors(v) for v in range(g.v_count)], list(g.iter_bfs(2, reverse=True)))
+    g.remove_vertex(1)
+    print(g.get_edges(), [g.in_degree(v) for v in range(g.v_count)])
+
+    print("\nstrongly_connected_components() / condensation() example")
+    print("-----------------------------------------------------------")
+    g = DirectedGraph([(0, 1, 1), (1, 2, 1), (2, 0, 1), (2, 3, 4), (3, 4, 1), (4, 3, 2), (1, 4, 6), (5, 0, 3)])
+    labels, dag = g.condensation()
+    print(list(labels), dag.get_edges())
+
+    print("\ntrack_acyclicity() example")
+    print("--------------------------")
+    g = DirectedGraph([(0, 1, 1), (1, 2, 1), (3, 4, 1)])
+    g.track_acyclicity()
+    for src, dst in [(2, 3), (4, 0), (0, 4)]:
+        g.add_edge(src, dst)
+        print(f'add {src}->{dst}', g.has_cycle(), g.topological_sort())
+    g.remove_edge(4, 0)
+    print('remove 4->0', g.has_cycle(), g.topological_sort())
@@ -0,0 +1,83 @@
+# Course: CS261 - Data Structures
+# Student Name: Nick Askam
+# Assignment: 6
+# Description: Helpers behind the async graph queries. A traversal generator is stepped on the event loop and hands
+#               control back every few vertices, or the plain query is run on an executor and awaited
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_YIELD_EVERY = 1000
+
+
+async def collect(graph, steps, yield_every: int = DEFAULT_YIELD_EVERY, deadline=None) -> []:
+    """
+    Return everything the generator steps yields as a list, see drain()
+    """
+    items = []
+    await _step(graph, steps, yield_every, deadline, items.append)
+    return items
+
+
+async def drain(graph, steps, yield_every: int = DEFAULT_YIELD_EVERY, deadline=None) -> None:
+    """
+    Run the generator steps to the end, throwing away what it yields
+    - every yield_every items the event loop gets a turn, which is also where cancellation lands
+    - deadline is an event loop time (loop.time()), asyncio.TimeoutError is raised once it has passed
+    - RuntimeError is raised if the graph is changed while the query is paused
+    """
+    await _step(graph, steps, yield_every, deadline, None)
+
+
+async def offload(graph, executor, deadline, name: str, *args):
+    """
+    Run graph.name(*args) on a thread or process pool executor and wait for its answer
+    - a thread pool calls the graph's own method, so its cache and instrumentation are used
+    - a process pool is sent a plain copy() of the graph, which never carries wrapped methods and
+      always pickles; the copy is pickled for every call, dijkstra_many() shares one copy instead
+    Past the deadline asyncio.TimeoutError is raised, the worker itself cannot be stopped and runs to the end
+    """
+    loop = asyncio.get_running_loop()
+    if isinstance(executor, ProcessPoolExecutor):
+        future = loop.run_in_executor(executor, _call, graph.copy(), name, args)
+    else:
+        future = loop.run_in_executor(executor, getattr(graph, name), *args)
+    if deadline is None:
+        return await future
+    return await asyncio.wait_for(future, max(0, deadline - loop.time()))
+
+
+def _call(graph, name: str, args: tuple):
+    """
+    Run one query in a worker process, module level so it can be pickled
+    """
+    return getattr(graph, name)(*args)
+
+
+async def _step(graph, steps, yield_every: int, deadline, append) -> None:
+    """
+    Shared loop of collect() and drain()
+    """
+    loop = asyncio.get_running_loop()
+    version = graph._version
+    yield_every = max(1, yield_every)
+    count = 0
+    try:
+        if deadline is not None and loop.time() >= deadline:
+            raise asyncio.TimeoutError
+        for item in steps:
+            if append is not None:
+                append(item)
+            count += 1
+            if count < yield_every:
+                continue
+
+            count = 0
+            await asyncio.sleep(0)
+            if deadline is not None and loop.time() >= deadline:
+                raise asyncio.TimeoutError
+            # the generator holds on to state that a mutation would leave stale
+            if graph._version != version:
+                raise RuntimeError('graph changed during an async query')
+    finally:
+        steps.close()
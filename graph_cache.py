@@ -0,0 +1,159 @@
+# Course: CS261 - Data Structures
+# Student Name: Nick Askam
+# Assignment: 6
+# Description: Opt-in query result cache shared by the directed and undirected graphs. Results are kept in LRU order
+#               under a memory budget and thrown away as soon as the graph's version counter moves
+
+import sys
+from array import array
+from collections import OrderedDict
+from functools import wraps
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class QueryCache:
+    """
+    LRU cache of query results for one graph
+    - a result is only reused while the graph version it was computed at is current
+    - the least recently used results are evicted to keep the estimated size under max_bytes
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Start empty, the version is picked up from the first lookup
+        """
+        self.max_bytes = max_bytes
+        self.version = None
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # key -> (result, estimated size), oldest first
+        self._entries = OrderedDict()
+
+    def wrap(self, graph, name: str, method):
+        """
+        Return a version of the bound method that answers from the cache when it can
+        """
+        @wraps(method)
+        def cached(*args, **kwargs):
+            try:
+                key = (name, _freeze(args), _freeze(sorted(kwargs.items())))
+                hash(key)
+            except TypeError:
+                # arguments that cannot be hashed are never cached
+                return method(*args, **kwargs)
+
+            found, result = self.get(key, graph._version)
+            if not found:
+                result = method(*args, **kwargs)
+                self.put(key, result, graph._version)
+            # hand out a copy so the caller cannot change the cached result
+            return _copy(result)
+
+        return cached
+
+    def get(self, key, version) -> (bool, object):
+        """
+        Return (True, result) for a cached result, (False, None) otherwise
+        """
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self.clear()
+            self.version = version
+
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return True, entry[0]
+
+    def put(self, key, result, version) -> None:
+        """
+        Store a result computed at version, evicting old results to make room
+        """
+        if version != self.version:
+            return
+        size = _size(result)
+        if size > self.max_bytes:
+            return
+
+        self._entries[key] = (result, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= evicted
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Drop every cached result, the counters are kept
+        """
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self) -> {}:
+        """
+        Return the hit / miss counters and current size as a dict
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'invalidations': self.invalidations, 'entries': len(self._entries),
+                'bytes': self.size, 'max_bytes': self.max_bytes}
+
+
+def install(graph, names, max_bytes: int = DEFAULT_MAX_BYTES) -> QueryCache:
+    """
+    Put cached versions of the named methods on the graph instance and return their cache
+    The class methods are untouched, so graphs without a cache pay nothing
+    """
+    uninstall(graph, names)
+    cache = QueryCache(max_bytes)
+    for name in names:
+        setattr(graph, name, cache.wrap(graph, name, getattr(graph, name)))
+    return cache
+
+
+def uninstall(graph, names) -> None:
+    """
+    Remove the cached methods so the class methods are used again
+    """
+    for name in names:
+        graph.__dict__.pop(name, None)
+
+
+def _freeze(value):
+    """
+    Turn list and set arguments into hashable tuples and frozensets
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    return value
+
+
+def _copy(value):
+    """
+    Copy lists and arrays (also inside tuples), everything else is immutable
+    """
+    if isinstance(value, (list, array)):
+        return value[:]
+    if isinstance(value, tuple):
+        return tuple(_copy(item) for item in value)
+    return value
+
+
+def _size(value) -> int:
+    """
+    Rough size of a result in bytes, counting the items of lists and tuples
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        size += sum(_size(item) for item in value)
+    return size
@@ -0,0 +1,98 @@
+# Course: CS261 - Data Structures
+# Student Name: Nick Askam
+# Assignment: 6
+# Description: Methods DirectedGraph and UndirectedGraph share word for word, kept in one place so they cannot drift
+
+import graph_async
+import graph_cache
+import graph_stats
+
+
+class GraphCommon:
+    """
+    Base class of DirectedGraph and UndirectedGraph
+    Each graph class names what is cached in _cached_queries and what is counted in _instrumented
+    """
+
+    # adds nothing to the instance layout of the compact, slotted graph classes
+    __slots__ = ()
+
+    # bumped by every change to the graph, cached query results are only used while it stays the same
+    _version = 0
+    # query result cache, only kept while cache_queries() is on
+    _cache = None
+    _cached_queries = ()
+    # counters, only kept while instrument() is on, and what the instrumentation wraps
+    _stats = None
+    _instrumented = {}
+
+    def memory_usage(self) -> int:
+        """
+        Return an estimate of the bytes this graph holds, indexes and cached results included
+        """
+        return graph_stats.deep_size(self)
+
+    def cache_queries(self, enabled: bool = True, max_bytes: int = graph_cache.DEFAULT_MAX_BYTES) -> None:
+        """
+        Remember the results of the read-only queries in _cached_queries until the graph changes
+        Least recently used results are dropped to stay under max_bytes (estimated).
+        Only changes made through the graph's methods are noticed
+        """
+        # the instrumentation has to stay on the outside of the cache
+        if self._stats is not None:
+            graph_stats.uninstall(self, self._stats)
+        graph_cache.uninstall(self, self._cached_queries)
+        self._cache = graph_cache.install(self, self._cached_queries, max_bytes) if enabled else None
+        if self._stats is not None:
+            graph_stats.install(self, self._stats, self._instrumented)
+
+    def cache_stats(self) -> {}:
+        """
+        Return the hit / miss counters of the query cache, None if it is off
+        """
+        return self._cache.stats() if self._cache is not None else None
+
+    def instrument(self, enabled: bool = True) -> None:
+        """
+        Count calls, wall time, vertices visited, edges scanned, heap pushes / pops and cache hits
+        for each operation in _instrumented, starting from zero. While off nothing is wrapped, so it costs nothing
+        """
+        if self._stats is not None:
+            graph_stats.uninstall(self, self._stats)
+        self._stats = graph_stats.install(self, graph_stats.GraphStats(), self._instrumented) if enabled else None
+
+    def stats_snapshot(self) -> {}:
+        """
+        Return the counters as {operation: {counter: value}}, None if instrument() is off
+        """
+        return self._stats.snapshot() if self._stats is not None else None
+
+    def profile(self):
+        """
+        Context manager that counts into fresh stats for one block:
+        with graph.profile() as stats: ... then stats.snapshot()
+        """
+        return graph_stats.profile(self)
+
+    async def adfs(self, v_start, v_end=None, yield_every: int = graph_async.DEFAULT_YIELD_EVERY,
+                   deadline=None, executor=None) -> []:
+        """
+        Async dfs() that lets the event loop run every yield_every visited vertices
+        - deadline is an event loop time (loop.time()), asyncio.TimeoutError is raised once it has passed
+        - cancelling the awaiting task stops the walk at the next hand-over
+        - with an executor the plain dfs() runs there instead and is awaited
+        """
+        if executor is not None:
+            return await graph_async.offload(self, executor, deadline, 'dfs', v_start, v_end)
+        stop_when = None if v_end is None else (lambda vertex: vertex == v_end)
+        return await graph_async.collect(self, self.iter_dfs(v_start, stop_when=stop_when), yield_every, deadline)
+
+    async def abfs(self, v_start, v_end=None, yield_every: int = graph_async.DEFAULT_YIELD_EVERY,
+                   deadline=None, executor=None) -> []:
+        """
+        Async bfs(), same options as adfs()
+        """
+        if executor is not None:
+            return await graph_async.offload(self, executor, deadline, 'bfs', v_start, v_end)
+        stop_when = None if v_end is None else (lambda vertex: vertex == v_end)
+        return await graph_async.collect(self, self.iter_bfs(v_start, stop_when=stop_when), yield_every, deadline)
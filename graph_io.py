@@ -0,0 +1,143 @@
+# Course: CS261 - Data Structures
+# Student Name: Nick Askam
+# Assignment: 6
+# Description: Compact binary file format shared by the directed and undirected graphs. A header is followed by
+#               offset / target / weight arrays (and vertex names) that can be memory mapped without copying.
+#               Also streams plain CSV / TSV edge lists
+
+import csv
+import mmap
+import struct
+import sys
+from array import array
+from collections import namedtuple
+
+MAGIC = b'GRPH'
+VERSION = 1
+
+# magic, version, flags, vertex count, edge entries, name bytes
+_HEADER = struct.Struct('<4sHHqqq')
+
+# flag bits
+DIRECTED = 1
+FLOAT_WEIGHTS = 2
+HAS_WEIGHTS = 4
+HAS_NAMES = 8
+LITTLE_ENDIAN = 16
+
+# arrays come back as memoryviews over the file, names as a list of str (or None)
+GraphImage = namedtuple('GraphImage', ['directed', 'offsets', 'targets', 'weights', 'names'])
+
+
+def write_graph(path, offsets, targets, weights=None, names=None, directed=True) -> None:
+    """
+    Write a graph in compressed sparse row form
+    - offsets has v_count + 1 entries, the edges of v are targets[offsets[v]:offsets[v + 1]]
+    - weights is an 'q' or 'd' array lined up with targets, or None
+    - names is a list of v_count strings, or None for integer vertices
+    """
+    v_count = len(offsets) - 1
+    flags = DIRECTED if directed else 0
+    if sys.byteorder == 'little':
+        flags |= LITTLE_ENDIAN
+
+    sections = [array('q', offsets), array('q', targets)]
+    if weights is not None:
+        flags |= HAS_WEIGHTS
+        if weights.typecode == 'd':
+            flags |= FLOAT_WEIGHTS
+        sections.append(weights)
+
+    blob = b''
+    if names is not None:
+        flags |= HAS_NAMES
+        encoded = []
+        name_offsets = array('q', [0])
+        for name in names:
+            if not isinstance(name, str):
+                raise TypeError(f'vertex names must be str to be saved, got {name!r}')
+            encoded.append(name.encode('utf-8'))
+            name_offsets.append(name_offsets[-1] + len(encoded[-1]))
+        sections.append(name_offsets)
+        blob = b''.join(encoded)
+
+    with open(path, 'wb') as out:
+        out.write(_HEADER.pack(MAGIC, VERSION, flags, v_count, len(targets), len(blob)))
+        for section in sections:
+            out.write(section.tobytes())
+        out.write(blob)
+
+
+def read_graph(path, use_mmap: bool = True) -> GraphImage:
+    """
+    Read a file written by write_graph()
+    With use_mmap the arrays are read-only views straight into the mapped file,
+    so processes that load the same file share one copy in the page cache
+    """
+    with open(path, 'rb') as file:
+        if use_mmap:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            data = file.read()
+
+    view = memoryview(data)
+    if len(view) < _HEADER.size:
+        raise ValueError(f'{path} is not a graph file')
+    magic, version, flags, v_count, e_count, name_bytes = _HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError(f'{path} is not a graph file')
+    if version != VERSION:
+        raise ValueError(f'{path} uses graph file version {version}, only {VERSION} is supported')
+    if bool(flags & LITTLE_ENDIAN) != (sys.byteorder == 'little'):
+        raise ValueError(f'{path} was written on a machine with a different byte order')
+
+    position = _HEADER.size
+
+    def take(typecode: str, count: int):
+        nonlocal position
+        size = count * 8
+        if position + size > len(view):
+            raise ValueError(f'{path} is truncated')
+        section = view[position:position + size].cast(typecode)
+        position += size
+        return section
+
+    offsets = take('q', v_count + 1)
+    targets = take('q', e_count)
+    weights = None
+    if flags & HAS_WEIGHTS:
+        weights = take('d' if flags & FLOAT_WEIGHTS else 'q', e_count)
+
+    names = None
+    if flags & HAS_NAMES:
+        name_offsets = take('q', v_count + 1)
+        if position + name_bytes > len(view):
+            raise ValueError(f'{path} is truncated')
+        blob = view[position:position + name_bytes]
+        names = [str(blob[name_offsets[v]:name_offsets[v + 1]], 'utf-8') for v in range(v_count)]
+
+    return GraphImage(bool(flags & DIRECTED), offsets, targets, weights, names)
+
+
+def read_edge_file(source, delimiter: str = ','):
+    """
+    Yield the stripped fields of each edge line in a CSV / TSV file, one line at a time
+    source is a path or an open text file, blank lines and lines starting with # are skipped
+    """
+    if hasattr(source, 'read'):
+        yield from _edge_lines(source, delimiter)
+        return
+
+    with open(source, newline='') as file:
+        yield from _edge_lines(file, delimiter)
+
+
+def _edge_lines(file, delimiter: str):
+    """
+    Yield the fields of every edge line in an open file
+    """
+    for fields in csv.reader(file, delimiter=delimiter):
+        fields = [field.strip() for field in fields]
+        if not fields or not fields[0] or fields[0].startswith('#'):
+            continue
+        yield fields
@@ -0,0 +1,182 @@
+# Course: CS261 - Data Structures
+# Student Name: Nick Askam
+# Assignment: 6
+# Description: Snapshot isolation for any of the graph classes. Readers share the current version without locking,
+#               a writer changes a private copy and publishes it as the next version in one step
+
+import threading
+from collections.abc import Mapping, Sequence
+from contextlib import contextmanager
+
+# methods that change a graph or the wrappers installed on it, not available on a snapshot
+MUTATORS = frozenset(('add_vertex', 'add_edge', 'remove_edge', 'remove_vertex', 'add_edges_bulk', 'compact',
+                      'track_acyclicity', 'cache_queries', 'instrument', 'profile', '_load_csr'))
+
+
+class GraphView:
+    """
+    Read-only view of one published graph version
+    - queries are passed through to the graph, mutators raise AttributeError
+    - adj_list / adj_matrix come back read-only, each row as a tuple (a read-only array for numpy)
+    - the graph behind a view never changes, so any number of threads can query it at once;
+      underscore attributes are passed through unguarded and must not be changed
+    """
+
+    __slots__ = ('_graph', 'version')
+
+    def __init__(self, graph, version: int):
+        """
+        Wrap graph, which nobody may change from now on
+        """
+        self._graph = graph
+        self.version = version
+
+    def __getattr__(self, name: str):
+        if name in MUTATORS:
+            raise AttributeError(f'{name}() is not available on a graph snapshot, use GraphStore.write()')
+        return getattr(self._graph, name)
+
+    def __str__(self):
+        return str(self._graph)
+
+    @property
+    def adj_list(self) -> Mapping:
+        """
+        The graph's adj_list as a read-only mapping
+        """
+        return _FrozenMapping(self._graph.adj_list)
+
+    @property
+    def adj_matrix(self):
+        """
+        The graph's adj_matrix as read-only rows
+        """
+        matrix = self._graph.adj_matrix
+        if hasattr(matrix, 'flags'):
+            # numpy: a view of the same data that refuses writes
+            matrix = matrix.view()
+            matrix.flags.writeable = False
+            return matrix
+        return _FrozenRows(matrix)
+
+    def copy(self):
+        """
+        Return a private, changeable copy of this version
+        """
+        return self._graph.copy()
+
+
+class GraphStore:
+    """
+    Holds the current version of a graph for many reader threads and one writer at a time
+    - snapshot() returns the current version as a GraphView, no copy and no lock
+    - write() hands out a copy of the current version, everything changed in the with block
+      is published together as the next version, or thrown away if the block raises
+    - a snapshot keeps answering from its own version while newer ones are published
+    """
+
+    def __init__(self, graph):
+        """
+        Publish a copy of graph as version 0, the graph passed in stays with the caller
+        """
+        self._lock = threading.Lock()
+        self._current = GraphView(graph.copy(), 0)
+
+    @property
+    def version(self) -> int:
+        """
+        Number of the version snapshot() returns
+        """
+        return self._current.version
+
+    def snapshot(self) -> GraphView:
+        """
+        Return the current version, reading one attribute so it is atomic
+        """
+        return self._current
+
+    @contextmanager
+    def write(self):
+        """
+        with store.write() as graph: ... changes a copy that is published when the block ends
+        Writers take turns, each batch costs one O(V + E) copy however many changes it makes
+        The graph handed out refuses every use once the block ends, it has become the published version
+        """
+        with self._lock:
+            graph = self._current.copy()
+            draft = _Draft(graph)
+            try:
+                yield draft
+            finally:
+                draft._graph = None
+            self._current = GraphView(graph, self._current.version + 1)
+
+
+class _Draft:
+    """
+    What write() hands out, passes everything through to the copy being changed until the with block ends
+    """
+
+    __slots__ = ('_graph',)
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __getattr__(self, name: str):
+        return getattr(self._open(), name)
+
+    def __str__(self):
+        return str(self._open())
+
+    def _open(self):
+        """
+        Return the graph being changed, RuntimeError once it has been published or thrown away
+        """
+        if self._graph is None:
+            raise RuntimeError('the graph from GraphStore.write() is only usable inside its with block')
+        return self._graph
+
+
+class _FrozenMapping(Mapping):
+    """
+    Read-only stand-in for adj_list, a vertex's neighbours come back as a tuple
+    """
+
+    __slots__ = ('_rows',)
+
+    def __init__(self, rows: {}):
+        self._rows = rows
+
+    def __getitem__(self, vertex) -> tuple:
+        return tuple(self._rows[vertex])
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+
+class _FrozenRows(Sequence):
+    """
+    Read-only stand-in for adj_matrix, each row comes back as a tuple
+    """
+
+    __slots__ = ('_rows',)
+
+    def __init__(self, rows: []):
+        self._rows = rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [tuple(row) for row in self._rows[index]]
+        return tuple(self._rows[index])
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
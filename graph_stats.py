@@ -0,0 +1,192 @@
+# Course: CS261 - Data Structures
+# Student Name: Nick Askam
+# Assignment: 6
+# Description: Optional instrumentation for the directed and undirected graphs. Counts vertices visited, edges scanned,
+#               heap operations, cache hits and wall time per operation by wrapping methods on one graph instance
+
+import gc
+import sys
+import time
+import types
+from contextlib import contextmanager
+from functools import wraps
+
+COUNTERS = ('calls', 'seconds', 'max_seconds', 'vertices_visited', 'edges_scanned',
+            'heap_pushes', 'heap_pops', 'cache_hits', 'cache_misses')
+
+# objects every graph shares, never counted by deep_size()
+_SHARED = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType, bool)
+
+
+class GraphStats:
+    """
+    Counters per operation name
+    - work done inside an operation (including nested operations) is counted under the outermost one
+    - edges_scanned counts the edges looked at from visited vertices, for dijkstra these are the relaxations
+    """
+
+    def __init__(self):
+        """
+        Start with no operations recorded
+        """
+        self.ops = {}
+        # counters of the outermost operation that is running, None between operations
+        self.current = None
+        # instance attributes that were replaced, restored by uninstall()
+        self.saved = {}
+
+    def counters(self, name: str) -> {}:
+        """
+        Return the counters of one operation, creating them on first use
+        """
+        counters = self.ops.get(name)
+        if counters is None:
+            counters = self.ops[name] = dict.fromkeys(COUNTERS, 0)
+        return counters
+
+    def snapshot(self) -> {}:
+        """
+        Return a copy of all counters as {operation: {counter: value}}
+        """
+        return {name: dict(counters) for name, counters in self.ops.items()}
+
+    def reset(self) -> None:
+        """
+        Set every counter back to zero
+        """
+        self.ops.clear()
+
+
+def install(graph, stats: GraphStats, spec: {}) -> GraphStats:
+    """
+    Put counting versions of the methods named in spec on the graph instance
+    spec maps a method name to what it counts:
+    - 'op' times the call and counts it as an operation
+    - 'expand' returns the edges of a visited vertex
+    - 'push' / 'pop' are the heap functions
+    """
+    wrappers = {'op': _wrap_op, 'expand': _wrap_expand, 'push': _wrap_push, 'pop': _wrap_pop}
+    for name, kind in spec.items():
+        stats.saved[name] = graph.__dict__.get(name)
+        setattr(graph, name, wrappers[kind](graph, stats, name, getattr(graph, name)))
+    return stats
+
+
+def uninstall(graph, stats: GraphStats) -> None:
+    """
+    Put back whatever the instance had before install()
+    """
+    for name, previous in stats.saved.items():
+        if previous is None:
+            graph.__dict__.pop(name, None)
+        else:
+            setattr(graph, name, previous)
+    stats.saved = {}
+
+
+@contextmanager
+def profile(graph):
+    """
+    Count into a fresh GraphStats for the duration of a with block, then go back to the previous state
+    Instrumentation that was already on is paused inside the block
+    """
+    previous = graph._stats
+    if previous is not None:
+        uninstall(graph, previous)
+    stats = graph._stats = install(graph, GraphStats(), graph._instrumented)
+    try:
+        yield stats
+    finally:
+        uninstall(graph, stats)
+        graph._stats = previous
+        if previous is not None:
+            install(graph, previous, graph._instrumented)
+
+
+def _wrap_op(graph, stats: GraphStats, name: str, method):
+    """
+    Time an operation and collect everything counted while it runs
+    """
+    @wraps(method)
+    def op(*args, **kwargs):
+        if stats.current is not None:
+            return method(*args, **kwargs)
+
+        counters = stats.counters(name)
+        cache = graph._cache
+        if cache is not None:
+            hits, misses = cache.hits, cache.misses
+        stats.current = counters
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            stats.current = None
+            counters['calls'] += 1
+            counters['seconds'] += seconds
+            if seconds > counters['max_seconds']:
+                counters['max_seconds'] = seconds
+            if cache is not None:
+                counters['cache_hits'] += cache.hits - hits
+                counters['cache_misses'] += cache.misses - misses
+
+    return op
+
+
+def _wrap_expand(graph, stats: GraphStats, name: str, method):
+    """
+    Count a visited vertex and the edges it has
+    """
+    @wraps(method)
+    def expand(v):
+        edges = method(v)
+        counters = stats.current
+        if counters is not None:
+            counters['vertices_visited'] += 1
+            counters['edges_scanned'] += len(edges)
+        return edges
+
+    return expand
+
+
+def _wrap_push(graph, stats: GraphStats, name: str, push):
+    """
+    Count heap pushes
+    """
+    def counted_push(heap, item):
+        if stats.current is not None:
+            stats.current['heap_pushes'] += 1
+        push(heap, item)
+
+    return counted_push
+
+
+def _wrap_pop(graph, stats: GraphStats, name: str, pop):
+    """
+    Count heap pops
+    """
+    def counted_pop(heap):
+        if stats.current is not None:
+            stats.current['heap_pops'] += 1
+        return pop(heap)
+
+    return counted_pop
+
+
+def deep_size(obj) -> int:
+    """
+    Estimate the bytes used by obj and everything it references, each object counted once
+    Classes, modules, functions and small ints are shared by every graph so they are left out
+    """
+    seen = set()
+    stack = [obj]
+    size = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, _SHARED) or item is None or (type(item) is int and -5 <= item <= 256):
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        stack.extend(gc.get_referents(item))
+    return size
@@ -5,9 +5,16 @@
 #               , valid path, and count the connected
 
 import heapq
+from bisect import bisect_left, insort
+from array import array
+from collections import deque
 
+import graph_async
+import graph_io
+from graph_common import GraphCommon
 
-class UndirectedGraph:
+
+class UndirectedGraph(GraphCommon):
     """
     Class to implement undirected graph
     - duplicate edges not allowed
@@ -16,6 +23,16 @@ class UndirectedGraph:
     - vertex names are strings
     """
 
+    # union-find over the vertices, built by count_connected_components() and
+    # dropped whenever an edge or vertex removal may have split a component
+    _components = None
+    # what cache_queries() remembers
+    _cached_queries = ('dfs', 'bfs', 'count_connected_components', 'has_cycle', 'find_cycle')
+    # what instrument() wraps
+    _instrumented = {'dfs': 'op', 'bfs': 'op', 'count_connected_components': 'op', 'has_cycle': 'op',
+                     'find_cycle': 'op', 'add_vertex': 'op', 'add_edge': 'op', 'remove_edge': 'op',
+                     'remove_vertex': 'op', '_neighbours': 'expand'}
+
     def __init__(self, start_edges=None):
         """
         Store graph info as adjacency list
@@ -45,10 +62,16 @@ class UndirectedGraph:
 
     def add_vertex(self, v: str) -> None:
         """
-        Add new vertex to the graph
+        Add new vertex to the graph, nothing happens if it is already there
         """
-        self.adj_list[v] = list()
-        
+        if v in self.adj_list:
+            return
+
+        self.adj_list[v] = _AdjacencySet()
+        self._version += 1
+        if self._components is not None:
+            self._components.add(v)
+
     def add_edge(self, u: str, v: str) -> None:
         """
         Add edge to the graph
@@ -64,9 +87,13 @@ class UndirectedGraph:
             # see if the value is already in the list, if not remove
             if v not in self.adj_list[u]:
                 self.adj_list[u].append(v)
+                self._version += 1
             if u not in self.adj_list[v]:
                 self.adj_list[v].append(u)
 
+            if self._components is not None:
+                self._components.union(u, v)
+
     def remove_edge(self, v: str, u: str) -> None:
         """
         Remove edge from the graph
@@ -76,17 +103,35 @@ class UndirectedGraph:
             # remove the vertex edges
             self.adj_list[u].remove(v)
             self.adj_list[v].remove(u)
+            self._version += 1
+            # the component may have split, rebuild on the next count
+            self._components = None
 
     def remove_vertex(self, v: str) -> None:
         """
         Remove vertex and all connected edges
         """
-        # remove vertex if in the graph
+        # remove vertex if in the graph, only its own neighbours need visiting
         if v in self.adj_list:
-            for endpoints in self.adj_list:
-                if endpoints in self.adj_list[v]:
-                    self.remove_edge(v, endpoints)
-            self.adj_list.pop(v)
+            # detach v's row first so its sorted copy is not kept up to date edge by edge
+            row = self.adj_list.pop(v)
+            for neighbour in row:
+                self.adj_list[neighbour].remove(v)
+            self._version += 1
+            if row:
+                # the component may have split, rebuild on the next count
+                self._components = None
+
+            # with no edges left the vertex is a component of its own
+            if self._components is not None:
+                self._components.discard(v)
+
+    def copy(self) -> 'UndirectedGraph':
+        """
+        Return an independent graph of the same class with the same vertices and edges
+        Caches and instrumentation are not carried over
+        """
+        return type(self)._from_adjacency({vertex: list(row) for vertex, row in self.adj_list.items()})
 
     def get_vertices(self) -> []:
         """
@@ -102,163 +147,948 @@ class UndirectedGraph:
         """
         Return list of edges in the graph (any order)
         """
-        edge_container = []
-        # look in each vertex for each connector to add
-        for vertex in self.adj_list:
-            for element in self.adj_list[vertex]:
-                # if it's already been added, do not add
-                if (element, vertex) not in edge_container:
-                    edge_container.append((vertex, element))
-        return edge_container
+        return list(self.iter_edges())
+
+    def iter_edges(self):
+        """
+        Yield each edge once as (u, v) in O(V + E)
+        An edge is reported from whichever endpoint was added to the graph first
+        """
+        adj_list = self.adj_list
+        position = {vertex: index for index, vertex in enumerate(adj_list)}
+        for vertex in adj_list:
+            vertex_position = position[vertex]
+            for element in adj_list[vertex]:
+                if vertex_position < position[element]:
+                    yield vertex, element
+
+    @classmethod
+    def from_edges(cls, edges):
+        """
+        Build a graph from (u, v) pairs in one pass, duplicates and self-loops are dropped
+        Works on any iterable, including generators
+        """
+        graph = cls()
+        graph.add_edges_bulk(edges)
+        return graph
+
+    @classmethod
+    def from_edge_file(cls, source, delimiter: str = ','):
+        """
+        Build a graph from a CSV (or TSV with delimiter='\\t') file of u, v lines
+        source is a path or an open text file, lines are streamed rather than read in one go
+        """
+        return cls.from_edges((fields[0], fields[1]) for fields in graph_io.read_edge_file(source, delimiter))
+
+    def add_edges_bulk(self, edges) -> None:
+        """
+        Add many (u, v) edges, same result as calling add_edge() for each one
+        """
+        adj_list = self.adj_list
+        components = self._components
+        for u, v in edges:
+            if u == v:
+                continue
+            if u not in adj_list:
+                self.add_vertex(u)
+            if v not in adj_list:
+                self.add_vertex(v)
+
+            # append() ignores a neighbour that is already there
+            adj_list[u].append(v)
+            adj_list[v].append(u)
+            if components is not None:
+                components.union(u, v)
+        self._version += 1
+
+    def save(self, path) -> None:
+        """
+        Write the graph to path in the compact binary format of graph_io
+        Vertex and neighbour order is kept, so a loaded graph prints the same
+        """
+        adj_list = self.adj_list
+        names = list(adj_list)
+        ids = {name: index for index, name in enumerate(names)}
+        offsets = array('q', [0])
+        targets = array('q')
+        for name in names:
+            targets.extend(ids[neighbour] for neighbour in adj_list[name])
+            offsets.append(len(targets))
+
+        graph_io.write_graph(path, offsets, targets, names=names, directed=False)
+
+    @classmethod
+    def load(cls, path, use_mmap: bool = True):
+        """
+        Read a graph written by save(), building the adjacency list in one pass
+        """
+        image = graph_io.read_graph(path, use_mmap)
+        if image.directed or image.names is None:
+            raise ValueError(f'{path} does not hold an undirected graph')
+
+        names, offsets, targets = image.names, image.offsets, image.targets
+        return cls._from_adjacency({
+            name: [names[target] for target in targets[offsets[index]:offsets[index + 1]]]
+            for index, name in enumerate(names)
+        })
+
+    @classmethod
+    def _from_adjacency(cls, adjacency: {}):
+        """
+        Build a graph from a complete {vertex: neighbours} mapping (both directions present)
+        """
+        graph = cls()
+        for name, neighbours in adjacency.items():
+            graph.adj_list[name] = _AdjacencySet(neighbours)
+        return graph
 
     def is_valid_path(self, path: []) -> bool:
         """
         Return true if provided path is valid, False otherwise
         """
-        # if the path is empty
-        if not path:
-            return True
+        return self._first_bad_vertex(path) == -1
 
-        path_length = path.__len__()
-        path_index = 0
-
-        # if the path only has one element
-        if path_length == 1:
-            if path[0] in self.adj_list:
-                return True
-            else:
-                return False
-
-        while path_index < path_length:
-            # if the path is in the list
-            if path[path_index] in self.adj_list:
-                # set what value should be checked based upon the index
-                if path_index != path_length - 1:
-                    path_index_check = path_index + 1
-                else:
-                    path_index_check = 0
-                # make sure the next index can be reached
-                if path[path_index_check] in self.adj_list[path[path_index]]:
-                    path_index += 1
-                else:
-                    return False
-            else:
-                return False
+    def validate_paths(self, paths) -> ([], []):
+        """
+        Check many paths at once, returns (valid, first_bad) lists lined up with paths
+        first_bad[i] is the index of the first vertex of paths[i] that is missing or is
+        not a neighbour of the vertex before, -1 if the whole path is valid
+        """
+        first_bad = [self._first_bad_vertex(path) for path in paths]
+        return [bad == -1 for bad in first_bad], first_bad
 
-        return True
+    def _first_bad_vertex(self, path: []) -> int:
+        """
+        Return the index of the first vertex where path breaks, -1 if it does not
+        """
+        adj_list = self.adj_list
+        for index, vertex in enumerate(path):
+            if vertex not in adj_list:
+                return index
+            if index and vertex not in adj_list[path[index - 1]]:
+                return index
+        return -1
 
     def dfs(self, v_start, v_end=None) -> []:
         """
         Return list of vertices visited during DFS search
         Vertices are picked in alphabetical order
         """
-        reachable_vertices = []
-
-        if v_start not in self.adj_list:
-            return reachable_vertices
-
-        stack = [v_start]
-
-        # as long as the stack is not empty
-        while stack.__len__() > 0:
-            popped_vertex = stack.pop()
-            # if the popped vertex is not in the current reachable vertices
-            if popped_vertex not in reachable_vertices:
-                reachable_vertices.append(popped_vertex)
-
-                if popped_vertex == v_end:
-                    return reachable_vertices
-                # reverse the list
-                reverse_list = sorted(self.adj_list[popped_vertex])[::-1]
-                # test the next vertices to see if they should be checked next
-                for vertex in reverse_list:
-                    if vertex not in reachable_vertices:
-                        stack.append(vertex)
-
-        return reachable_vertices
+        stop_when = None if v_end is None else (lambda vertex: vertex == v_end)
+        return list(self.iter_dfs(v_start, stop_when=stop_when))
 
     def bfs(self, v_start, v_end=None) -> []:
         """
         Return list of vertices visited during BFS search
         Vertices are picked in alphabetical order
         """
-        reachable_vertices = []
+        stop_when = None if v_end is None else (lambda vertex: vertex == v_end)
+        return list(self.iter_bfs(v_start, stop_when=stop_when))
 
+    def iter_dfs(self, v_start, max_depth=None, stop_when=None, with_info=False):
+        """
+        Yield vertices in DFS order as they are visited, alphabetical neighbour first
+        - vertices at max_depth are yielded but not expanded
+        - the walk ends right after a vertex for which stop_when(vertex) is True
+        - with_info yields (vertex, depth, parent) with depth along the DFS tree
+        """
         if v_start not in self.adj_list:
-            return reachable_vertices
+            return
 
-        # set the stack constants
-        stack = [v_start]
-        reachable_vertices.append(v_start)
+        visited = set()
+        stack = [(v_start, 0, None)]
 
         # as long as the stack is not empty
-        while stack.__len__() > 0:
-            # pop the last element
-            popped_vertex = stack.pop()
-            # return if at the end of the stack
-            if popped_vertex == v_end:
-                return reachable_vertices
-
-            # sort to find alphabetically
-            sorted_vertices = sorted(self.adj_list[popped_vertex])
-            # print("reachable: " + str(reachable_vertices))
-            # print("sorted: " + str(sorted_vertices))
-            for sibling in sorted_vertices:
-                # do processing if the sibling is not in reachable vertices
-                if sibling not in reachable_vertices:
-                    reachable_vertices.append(sibling)
-                    stack.insert(0, sibling)
-
-                # return if at the end of the stack
-                if sibling == v_end:
-                    return reachable_vertices
-
-        return reachable_vertices
+        while stack:
+            vertex, depth, parent = stack.pop()
+            if vertex in visited:
+                continue
+            visited.add(vertex)
+            yield (vertex, depth, parent) if with_info else vertex
+
+            if stop_when is not None and stop_when(vertex):
+                return
+            if max_depth is not None and depth >= max_depth:
+                continue
+
+            # push in reverse so the smallest neighbour is popped first
+            for neighbour in reversed(self._neighbours(vertex).in_order()):
+                if neighbour not in visited:
+                    stack.append((neighbour, depth + 1, vertex))
+
+    def iter_bfs(self, v_start, max_depth=None, stop_when=None, with_info=False):
+        """
+        Yield vertices in BFS order as they are discovered, alphabetical neighbour first
+        - vertices at max_depth are yielded but not expanded
+        - the walk ends right after a vertex for which stop_when(vertex) is True
+        - with_info yields (vertex, depth, parent) with depth in hops from v_start
+        """
+        if v_start not in self.adj_list:
+            return
+
+        visited = {v_start}
+        queue = deque([(v_start, 0)])
+        yield (v_start, 0, None) if with_info else v_start
+        if stop_when is not None and stop_when(v_start):
+            return
+
+        # as long as the queue is not empty
+        while queue:
+            vertex, depth = queue.popleft()
+            if max_depth is not None and depth >= max_depth:
+                continue
+
+            # neighbours come out alphabetically
+            for sibling in self._neighbours(vertex).in_order():
+                if sibling not in visited:
+                    visited.add(sibling)
+                    queue.append((sibling, depth + 1))
+                    yield (sibling, depth + 1, vertex) if with_info else sibling
+
+                    if stop_when is not None and stop_when(sibling):
+                        return
 
     def count_connected_components(self) -> int:
         """
         Return number of connected components in the graph
+        The union-find index is built once in O(V + E) and then kept up to date
+        by add_vertex() / add_edge(), so repeated counts are O(1)
         """
-        # set the intro values
-        connect_components = 0
-        total_vertices = self.get_vertices()
+        if self._components is None:
+            for _ in self._build_components():
+                pass
+        return self._components.count
 
-        # while there are still vertices left to be counted
-        while total_vertices:
-            for vertex in total_vertices:
-                total_vertices.remove(vertex)
-                # if the vertices is in bfs, remove
-                for value in self.bfs(vertex):
-                    if value in total_vertices:
-                        total_vertices.remove(value)
-                connect_components += 1
+    def _build_components(self):
+        """
+        Build the union-find index, yielding each vertex once its edges are joined
+        The index is only stored when the generator runs to the end
+        """
+        components = _DisjointSet()
+        for vertex in self.adj_list:
+            components.add(vertex)
+        for vertex in self.adj_list:
+            for neighbour in self._neighbours(vertex):
+                components.union(vertex, neighbour)
+            yield vertex
+        self._components = components
 
-        return connect_components
+    async def acount_connected_components(self, yield_every: int = graph_async.DEFAULT_YIELD_EVERY,
+                                          deadline=None, executor=None) -> int:
+        """
+        Async count_connected_components(), same options as adfs()
+        Only building the union-find index takes time, once it exists the count is returned straight away
+        """
+        if self._components is None:
+            if executor is not None:
+                return await graph_async.offload(self, executor, deadline, 'count_connected_components')
+            await graph_async.drain(self, self._build_components(), yield_every, deadline)
+        return self._components.count
 
     def has_cycle(self) -> bool:
         """
         Return True if graph contains a cycle, False otherwise
         """
-        available_vertices = self.get_vertices()
-        # print(self.get_edges())
-        for vertex in available_vertices:
-            # set the parent and go digging to find the children
-            parent = vertex
-            for next_vertex in self.adj_list[vertex]:
-                for next_next_vertex in self.adj_list[next_vertex]:
-                    if next_next_vertex != parent:
-                        found_parent = False
-                        dfs_next_next_vertex = self.dfs(next_next_vertex)
-
-                        # look in the dfs and see if a different path was taken to the parent (not reversed)
-                        for vertex_in_dfw in dfs_next_next_vertex:
-                            if vertex_in_dfw == next_vertex:
-                                found_parent = True
-                            if vertex_in_dfw == parent and not found_parent:
-                                return True
+        return self.find_cycle() is not None
+
+    def find_cycle(self) -> []:
+        """
+        Return one cycle as a closed path such as ['A', 'B', 'C', 'A'], None if there is no cycle
+        Iterative DFS that remembers each vertex's parent, O(V + E)
+        """
+        parent = dict()
+        for root in self.adj_list:
+            if root in parent:
+                continue
+            parent[root] = None
+            stack = [(root, iter(self._neighbours(root)))]
+
+            while stack:
+                vertex, neighbours = stack[-1]
+                for next_vertex in neighbours:
+                    if next_vertex not in parent:
+                        parent[next_vertex] = vertex
+                        stack.append((next_vertex, iter(self._neighbours(next_vertex))))
+                        break
+
+                    # a visited vertex other than the parent is an ancestor, walk back up to it
+                    if next_vertex != parent[vertex]:
+                        cycle = [vertex]
+                        while cycle[-1] != next_vertex:
+                            cycle.append(parent[cycle[-1]])
+                        cycle.reverse()
+                        cycle.append(next_vertex)
+                        return cycle
+                else:
+                    stack.pop()
+
+        return None
+
+    def _neighbours(self, v):
+        """
+        Return the neighbours of v, every traversal expands a vertex through here
+        """
+        return self.adj_list[v]
+
+
+class InternedUndirectedGraph(UndirectedGraph):
+    """
+    Undirected graph that maps vertex names to dense integer ids
+    - same rules and public methods as UndirectedGraph
+    - each vertex's neighbours are an array('I') of ids kept in alphabetical
+      order of their names, so traversals never sort and work on ints
+    - adj_list is built on request (for printing), neighbours show in alphabetical order
+    - from_edges() and load() hand out ids in alphabetical order, so those rows
+      are put in order by sorting plain ints
+    """
+
+    def __init__(self, start_edges=None):
+        """
+        Store graph info as id-indexed neighbour arrays plus the name <-> id mapping
+        """
+        self._ids = dict()
+        # id -> name and id -> neighbour ids, both None for a removed vertex whose id is free again
+        self._names = []
+        self._rows = []
+        self._free_ids = []
+
+        # populate graph with initial vertices and edges (if provided)
+        if start_edges is not None:
+            for u, v in start_edges:
+                self.add_edge(u, v)
+
+    def __str__(self):
+        """
+        Same output as UndirectedGraph.__str__, building adj_list once instead of once per vertex
+        """
+        adj_list = self.adj_list
+        out = [f'{v}: {adj_list[v]}' for v in adj_list]
+        out = '\n  '.join(out)
+        if len(out) < 70:
+            out = out.replace('\n  ', ', ')
+            return f'GRAPH: {{{out}}}'
+        return f'GRAPH: {{\n  {out}}}'
+
+    @property
+    def adj_list(self) -> {}:
+        """
+        Return {vertex: [neighbours]} in the same shape as UndirectedGraph.adj_list (a copy)
+        """
+        names = self._names
+        return {names[vertex]: [names[neighbour] for neighbour in row]
+                for vertex, row in enumerate(self._rows) if row is not None}
+
+    def add_vertex(self, v: str) -> None:
+        """
+        Add new vertex to the graph, nothing happens if it is already there
+        """
+        if v in self._ids:
+            return
+
+        if self._free_ids:
+            vertex = self._free_ids.pop()
+            self._names[vertex] = v
+            self._rows[vertex] = array('I')
+        else:
+            vertex = len(self._names)
+            self._names.append(v)
+            self._rows.append(array('I'))
+        self._ids[v] = vertex
+        self._version += 1
+
+        if self._components is not None:
+            self._components.add(vertex)
+
+    def add_edge(self, u: str, v: str) -> None:
+        """
+        Add edge to the graph
+        """
+        if u == v:
+            return
+        self.add_vertex(u)
+        self.add_vertex(v)
+        u_id, v_id = self._ids[u], self._ids[v]
+
+        # keep both rows in alphabetical order
+        row = self._rows[u_id]
+        index = self._find(row, v)
+        if index < len(row) and row[index] == v_id:
+            return
+        self._row_insert(u_id, index, v_id)
+        self._row_insert(v_id, self._find(self._rows[v_id], u), u_id)
+        self._version += 1
+
+        if self._components is not None:
+            self._components.union(u_id, v_id)
+
+    def remove_edge(self, v: str, u: str) -> None:
+        """
+        Remove edge from the graph
+        """
+        if v in self._ids and u in self._ids and self._unlink(self._ids[u], self._ids[v]):
+            self._unlink(self._ids[v], self._ids[u])
+            self._version += 1
+            # the component may have split, rebuild on the next count
+            self._components = None
+
+    def remove_vertex(self, v: str) -> None:
+        """
+        Remove vertex and all connected edges
+        """
+        if v not in self._ids:
+            return
+
+        vertex = self._ids.pop(v)
+        had_edges = len(self._rows[vertex]) > 0
+        for neighbour in self._rows[vertex]:
+            self._unlink(neighbour, vertex)
+        self._names[vertex] = None
+        self._rows[vertex] = None
+        self._free_ids.append(vertex)
+        self._version += 1
+
+        if self._components is not None:
+            if had_edges:
+                self._components = None
+            else:
+                self._components.discard(vertex)
+
+    def copy(self) -> 'InternedUndirectedGraph':
+        """
+        Return an independent graph that keeps the same ids, so it prints and walks exactly like this one
+        """
+        graph = type(self)()
+        graph._ids = dict(self._ids)
+        graph._names = list(self._names)
+        graph._free_ids = list(self._free_ids)
+        for row in self._rows:
+            graph._rows.append(None if row is None else array('I', row))
+        return graph
+
+    def get_vertices(self) -> []:
+        """
+        Return list of vertices in the graph (any order)
+        """
+        return [name for name in self._names if name is not None]
+
+    def iter_edges(self):
+        """
+        Yield each edge once as (u, v), from the endpoint with the smaller id
+        """
+        names = self._names
+        for vertex, row in enumerate(self._rows):
+            if row is not None:
+                for neighbour in row:
+                    if vertex < neighbour:
+                        yield names[vertex], names[neighbour]
+
+    def save(self, path) -> None:
+        """
+        Write the graph straight from the id rows, free ids are closed up
+        The file is the same one UndirectedGraph.save() writes for adj_list
+        """
+        rows = self._rows
+        live = [vertex for vertex, row in enumerate(rows) if row is not None]
+        file_ids = [0] * len(rows)
+        for index, vertex in enumerate(live):
+            file_ids[vertex] = index
+
+        offsets = array('q', [0])
+        targets = array('q')
+        for vertex in live:
+            targets.extend(file_ids[neighbour] for neighbour in rows[vertex])
+            offsets.append(len(targets))
+
+        names = [self._names[vertex] for vertex in live]
+        graph_io.write_graph(path, offsets, targets, names=names, directed=False)
+
+    def add_edges_bulk(self, edges) -> None:
+        """
+        Add many (u, v) edges, same result as calling add_edge() for each one
+        """
+        for u, v in edges:
+            self.add_edge(u, v)
+
+    @classmethod
+    def from_edges(cls, edges):
+        """
+        Build a graph from (u, v) pairs in one pass, duplicates and self-loops are dropped
+        """
+        adjacency = dict()
+        for u, v in edges:
+            if u != v:
+                adjacency.setdefault(u, set()).add(v)
+                adjacency.setdefault(v, set()).add(u)
+        return cls._from_adjacency(adjacency)
+
+    @classmethod
+    def _from_adjacency(cls, adjacency: {}):
+        """
+        Build a graph from a complete {vertex: neighbours} mapping, ids go out in
+        alphabetical order so each row only needs its ints sorted
+        """
+        graph = cls()
+        graph._names = sorted(adjacency)
+        graph._ids = {name: vertex for vertex, name in enumerate(graph._names)}
+        ids = graph._ids
+        graph._rows = [array('I', sorted({ids[neighbour] for neighbour in adjacency[name]}))
+                       for name in graph._names]
+        return graph
+
+    def validate_paths(self, paths) -> ([], []):
+        """
+        Same as UndirectedGraph.validate_paths(), sharing one dict of hashed rows across the batch
+        """
+        lookups = dict()
+        first_bad = [self._first_bad_vertex(path, lookups) for path in paths]
+        return [bad == -1 for bad in first_bad], first_bad
+
+    def _first_bad_vertex(self, path: [], lookups=None) -> int:
+        """
+        Return the index of the first vertex where path breaks, -1 if it does not
+        Within a validate_paths() batch each row is hashed into lookups the first time
+        it is used, so later hops are O(1) instead of a binary search
+        """
+        previous = None
+        for index, vertex in enumerate(path):
+            current = self._ids.get(vertex)
+            if current is None:
+                return index
+            if index:
+                if lookups is None:
+                    if not self._has_edge(previous, current):
+                        return index
+                else:
+                    row = lookups.get(previous)
+                    if row is None:
+                        row = lookups[previous] = set(self._rows[previous])
+                    if current not in row:
+                        return index
+            previous = current
+        return -1
+
+    def iter_dfs(self, v_start, max_depth=None, stop_when=None, with_info=False):
+        """
+        Yield vertices in DFS order as they are visited, alphabetical neighbour first
+        - vertices at max_depth are yielded but not expanded
+        - the walk ends right after a vertex for which stop_when(vertex) is True
+        - with_info yields (vertex, depth, parent) with depth along the DFS tree
+        """
+        start = self._ids.get(v_start)
+        if start is None:
+            return
+
+        names, neighbours = self._names, self._neighbours
+        visited = bytearray(len(self._rows))
+        stack = [(start, 0, None)]
+
+        while stack:
+            vertex, depth, parent = stack.pop()
+            if visited[vertex]:
+                continue
+            visited[vertex] = 1
+            name = names[vertex]
+            yield (name, depth, None if parent is None else names[parent]) if with_info else name
+
+            if stop_when is not None and stop_when(name):
+                return
+            if max_depth is not None and depth >= max_depth:
+                continue
+
+            # push in reverse so the alphabetically first neighbour is popped first
+            for neighbour in reversed(neighbours(vertex)):
+                if not visited[neighbour]:
+                    stack.append((neighbour, depth + 1, vertex))
+
+    def iter_bfs(self, v_start, max_depth=None, stop_when=None, with_info=False):
+        """
+        Yield vertices in BFS order as they are discovered, alphabetical neighbour first
+        - vertices at max_depth are yielded but not expanded
+        - the walk ends right after a vertex for which stop_when(vertex) is True
+        - with_info yields (vertex, depth, parent) with depth in hops from v_start
+        """
+        start = self._ids.get(v_start)
+        if start is None:
+            return
+
+        names, neighbours = self._names, self._neighbours
+        visited = bytearray(len(self._rows))
+        visited[start] = 1
+        queue = deque([(start, 0)])
+        yield (v_start, 0, None) if with_info else v_start
+        if stop_when is not None and stop_when(v_start):
+            return
+
+        while queue:
+            vertex, depth = queue.popleft()
+            if max_depth is not None and depth >= max_depth:
+                continue
+
+            for neighbour in neighbours(vertex):
+                if not visited[neighbour]:
+                    visited[neighbour] = 1
+                    queue.append((neighbour, depth + 1))
+                    name = names[neighbour]
+                    yield (name, depth + 1, names[vertex]) if with_info else name
+
+                    if stop_when is not None and stop_when(name):
+                        return
+
+    def count_connected_components(self) -> int:
+        """
+        Return number of connected components in the graph
+        Same union-find scheme as UndirectedGraph, keyed by vertex id
+        """
+        if self._components is None:
+            for _ in self._build_components():
+                pass
+        return self._components.count
+
+    def _build_components(self):
+        """
+        Build the union-find index by vertex id, yielding each id once its edges are joined
+        """
+        components = _DisjointSet()
+        for vertex, row in enumerate(self._rows):
+            if row is not None:
+                components.add(vertex)
+                for neighbour in self._neighbours(vertex):
+                    components.add(neighbour)
+                    components.union(vertex, neighbour)
+                yield vertex
+        self._components = components
+
+    def find_cycle(self) -> []:
+        """
+        Return one cycle as a closed path such as ['A', 'B', 'C', 'A'], None if there is no cycle
+        Iterative DFS over ids that remembers each vertex's parent, O(V + E)
+        """
+        rows = self._rows
+        # -2 = not seen yet, -1 = root of a DFS tree
+        parent = [-2] * len(rows)
+        for root, row in enumerate(rows):
+            if row is None or parent[root] != -2:
+                continue
+            parent[root] = -1
+            stack = [(root, iter(self._neighbours(root)))]
+
+            while stack:
+                vertex, neighbours = stack[-1]
+                for next_vertex in neighbours:
+                    if parent[next_vertex] == -2:
+                        parent[next_vertex] = vertex
+                        stack.append((next_vertex, iter(self._neighbours(next_vertex))))
+                        break
+
+                    # a visited vertex other than the parent is an ancestor, walk back up to it
+                    if next_vertex != parent[vertex]:
+                        cycle = [vertex]
+                        while cycle[-1] != next_vertex:
+                            cycle.append(parent[cycle[-1]])
+                        cycle.reverse()
+                        cycle.append(next_vertex)
+                        return [self._names[v] for v in cycle]
+                else:
+                    stack.pop()
+
+        return None
+
+    def _neighbours(self, v: int) -> array:
+        """
+        Return the neighbour ids of id v in alphabetical order of their names
+        """
+        return self._rows[v]
 
+    def _find(self, row: array, name) -> int:
+        """
+        Return where name is (or would go) in a row kept in alphabetical order
+        """
+        names = self._names
+        low, high = 0, len(row)
+        while low < high:
+            middle = (low + high) // 2
+            if names[row[middle]] < name:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _has_edge(self, u: int, v: int) -> bool:
+        """
+        Return True if ids u and v are neighbours
+        """
+        row = self._rows[u]
+        index = self._find(row, self._names[v])
+        return index < len(row) and row[index] == v
+
+    def _unlink(self, u: int, v: int) -> bool:
+        """
+        Drop v from u's row, return False if it was not there
+        """
+        row = self._rows[u]
+        index = self._find(row, self._names[v])
+        if index < len(row) and row[index] == v:
+            self._row_delete(u, index)
+            return True
         return False
 
+    def _row_insert(self, vertex: int, index: int, neighbour: int) -> None:
+        """
+        Insert neighbour at index of vertex's row
+        """
+        self._rows[vertex].insert(index, neighbour)
+
+    def _row_delete(self, vertex: int, index: int) -> None:
+        """
+        Delete the neighbour at index of vertex's row
+        """
+        del self._rows[vertex][index]
+
+
+class CompactUndirectedGraph(InternedUndirectedGraph):
+    """
+    Undirected graph for processes that hold many small graphs
+    - same rules and public methods as UndirectedGraph, same id scheme as InternedUndirectedGraph
+    - all neighbour rows are packed into two shared arrays instead of one array per vertex
+    - the data lives in __slots__; UndirectedGraph still gives instances a __dict__, which stays empty
+      unless the cache or instrumentation puts wrapped methods in it
+    - about 2.5x smaller than UndirectedGraph, most of what is left is the vertex name strings
+      and the name -> id dict
+    - changing a row shifts the rest of the packed arrays, so mutations are O(V + E)
+    """
+
+    __slots__ = ('_ids', '_names', '_rows', '_free_ids', '_components', '_version', '_cache', '_stats')
+
+    def __init__(self, start_edges=None):
+        """
+        Store graph info as packed neighbour rows plus the name <-> id mapping
+        """
+        self._ids = dict()
+        self._names = []
+        self._rows = _PackedRows()
+        self._free_ids = []
+        self._components = None
+        self._version = 0
+        self._cache = None
+        self._stats = None
+
+        # populate graph with initial vertices and edges (if provided), packed in one pass
+        # like from_edges(), since add_edge() shifts the packed arrays every time
+        if start_edges is not None:
+            graph = self.from_edges(start_edges)
+            self._ids, self._names, self._rows = graph._ids, graph._names, graph._rows
+
+    @classmethod
+    def _from_adjacency(cls, adjacency: {}):
+        """
+        Build the rows like InternedUndirectedGraph does, then pack them
+        """
+        graph = super()._from_adjacency(adjacency)
+        graph._rows = _PackedRows(graph._rows)
+        return graph
+
+    def _row_insert(self, vertex: int, index: int, neighbour: int) -> None:
+        """
+        Insert neighbour at index of vertex's row
+        """
+        self._rows.insert(vertex, index, neighbour)
+
+    def _row_delete(self, vertex: int, index: int) -> None:
+        """
+        Delete the neighbour at index of vertex's row
+        """
+        self._rows.delete(vertex, index)
+
+
+class _PackedRows:
+    """
+    List of neighbour rows stored as one offsets array and one targets array
+    - row v is targets[offsets[v]:offsets[v + 1]], reading it returns an array slice
+    - a freed row reads as None, like the list of rows it stands in for
+    """
+
+    __slots__ = ('_offsets', '_targets', '_free')
+
+    def __init__(self, rows=()):
+        """
+        Pack the given rows, None marks a free id
+        """
+        self._offsets = array('I', [0])
+        self._targets = array('I')
+        self._free = bytearray()
+        for row in rows:
+            self.append(row)
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+    def __getitem__(self, v: int):
+        if self._free[v]:
+            return None
+        return self._targets[self._offsets[v]:self._offsets[v + 1]]
+
+    def __iter__(self):
+        for v in range(len(self._free)):
+            yield self[v]
+
+    def __setitem__(self, v: int, row) -> None:
+        """
+        Replace row v, None frees it
+        """
+        start, end = self._offsets[v], self._offsets[v + 1]
+        self._targets[start:end] = array('I', row or ())
+        self._shift(v, len(row or ()) - (end - start))
+        self._free[v] = row is None
+
+    def append(self, row) -> None:
+        """
+        Add a row for the next id
+        """
+        self._targets.extend(row or ())
+        self._offsets.append(len(self._targets))
+        self._free.append(row is None)
+
+    def insert(self, v: int, index: int, neighbour: int) -> None:
+        """
+        Insert neighbour at index of row v
+        """
+        self._targets.insert(self._offsets[v] + index, neighbour)
+        self._shift(v, 1)
+
+    def delete(self, v: int, index: int) -> None:
+        """
+        Delete the neighbour at index of row v
+        """
+        del self._targets[self._offsets[v] + index]
+        self._shift(v, -1)
+
+    def _shift(self, v: int, change: int) -> None:
+        """
+        Move the start of every row after v by change
+        """
+        if change:
+            offsets = self._offsets
+            for index in range(v + 1, len(offsets)):
+                offsets[index] += change
+
+
+class _AdjacencySet:
+    """
+    Insertion-ordered set of neighbours that prints like the list it replaces
+    - membership, append() and remove() are O(1)
+    - in_order() keeps a sorted copy for the alphabetical traversals, once built
+      it is kept up to date by bisect instead of being sorted again
+    """
+
+    __slots__ = ('_items', '_sorted')
+
+    def __init__(self, items=()):
+        """
+        Store the neighbours as keys of a dict, which keeps insertion order
+        """
+        self._items = dict.fromkeys(items)
+        self._sorted = None
+
+    def __contains__(self, v) -> bool:
+        return v in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __repr__(self) -> str:
+        return repr(list(self._items))
+
+    def append(self, v) -> None:
+        """
+        Add v after the existing neighbours
+        """
+        if v in self._items:
+            return
+        self._items[v] = None
+        if self._sorted is not None:
+            insort(self._sorted, v)
+
+    def remove(self, v) -> None:
+        """
+        Remove v, raising KeyError if it is not a neighbour
+        """
+        del self._items[v]
+        if self._sorted is not None:
+            del self._sorted[bisect_left(self._sorted, v)]
+
+    def in_order(self) -> []:
+        """
+        Return the neighbours in ascending order, the list is shared so do not modify it
+        """
+        if self._sorted is None:
+            self._sorted = sorted(self._items)
+        return self._sorted
+
+
+class _DisjointSet:
+    """
+    Union-find over vertex names with union by rank and path compression
+    """
+
+    def __init__(self):
+        """
+        Start with no elements
+        """
+        self.parent = dict()
+        self.rank = dict()
+        self.count = 0
+
+    def add(self, v) -> None:
+        """
+        Add v as a set of its own
+        """
+        if v not in self.parent:
+            self.parent[v] = v
+            self.rank[v] = 0
+            self.count += 1
+
+    def discard(self, v) -> None:
+        """
+        Remove v, which must be a set of its own (no other element points at it)
+        """
+        if v in self.parent:
+            del self.parent[v]
+            del self.rank[v]
+            self.count -= 1
+
+    def find(self, v):
+        """
+        Return the representative of the set holding v
+        """
+        root = v
+        while self.parent[root] != root:
+            root = self.parent[root]
+
+        # point everything on the way straight at the root
+        while self.parent[v] != root:
+            self.parent[v], v = root, self.parent[v]
+
+        return root
+
+    def union(self, u, v) -> None:
+        """
+        Merge the sets holding u and v
+        """
+        u, v = self.find(u), self.find(v)
+        if u == v:
+            return
+
+        # hang the shallower tree under the deeper one
+        if self.rank[u] < self.rank[v]:
+            u, v = v, u
+        self.parent[v] = u
+        if self.rank[u] == self.rank[v]:
+            self.rank[u] += 1
+        self.count -= 1
+
 
 if __name__ == '__main__':
 
@@ -345,3 +1175,19 @@ if __name__ == '__main__':
         u, v = edge
         g.add_edge(u, v) if command == 'add' else g.remove_edge(u, v)
         print('{:<10}'.format(case), g.has_cycle())
+
+    print("\niter_bfs() with depth limit example")
+    print("-----------------------------------")
+    edges = ['AE', 'AC', 'BE', 'CE', 'CD', 'CB', 'BD', 'ED', 'BH', 'QG', 'FG']
+    g = UndirectedGraph(edges)
+    print(list(g.iter_bfs('A', max_depth=1)))
+    print(list(g.iter_bfs('A', max_depth=2, with_info=True)))
+    walk = g.iter_dfs('A')
+    print([next(walk) for _ in range(3)])
+
+    print("\nfind_cycle() example")
+    print("--------------------")
+    g = UndirectedGraph(['AB', 'BC', 'CD', 'DE'])
+    print(g.find_cycle())
+    g.add_edge('E', 'B')
+    print(g.find_cycle())